@@ -1,6 +1,10 @@
 """Arbiter Dashboard v2 — all constants, defaults, and configuration."""
 
 import os
+import sys
+from collections.abc import Mapping
+from functools import lru_cache
+from types import MappingProxyType
 from typing import TypedDict
 
 # ── Single User Input ─────────────────────────────────────────────────────────
@@ -47,6 +51,7 @@ TAKER_FEE_PCT = 0.00045             # 4.5 bps (conservative tier-0)
 REBALANCES_PER_YEAR = 365 / 7       # ~52 (one round trip per week)
 # fee_drag_apr    = 2 * TAKER_FEE_PCT * REBALANCES_PER_YEAR * 100
 # slip_drag_apr_i = 2 * impact_at_alloc_i * REBALANCES_PER_YEAR * 100
+FEE_DRAG_APR = 2 * TAKER_FEE_PCT * REBALANCES_PER_YEAR * 100
 
 # ── Coinbase & Insurance ──────────────────────────────────────────────────────
 DEFAULT_COINBASE_APR = 3.50         # percent
@@ -80,17 +85,25 @@ HEDGE_MAP = {
     # Index → ETF proxies
     "xyz:XYZ100": "SPY",
 }
+# Intern keys/values so lookups with interned coin strings hit on identity.
+HEDGE_MAP = {sys.intern(k): sys.intern(v) for k, v in HEDGE_MAP.items()}
 
 # Non-stock coins — excluded when STOCK_ONLY_MODE is True.
 # These map to commodity ETFs or index ETFs, not individual equities.
-NON_STOCK_COINS: set[str] = {
+NON_STOCK_COINS: frozenset[str] = frozenset(sys.intern(c) for c in (
     "xyz:GOLD", "xyz:SILVER", "xyz:COPPER", "xyz:PLATINUM", "xyz:PALLADIUM",
     "xyz:URANIUM", "xyz:NATGAS", "xyz:CL", "xyz:XYZ100",
-}
+))
+
+# Mapped coins that are direct equities, in HEDGE_MAP order (and as a set)
+STOCK_COINS_ORDERED: tuple[str, ...] = tuple(c for c in HEDGE_MAP if c not in NON_STOCK_COINS)
+STOCK_COINS: frozenset[str] = frozenset(STOCK_COINS_ORDERED)
 
 # ── NASDAQ Symbol Directories ─────────────────────────────────────────────────
 NASDAQ_LISTED_URL = "https://ftp.nasdaqtrader.com/dynamic/SymDir/nasdaqlisted.txt"
 OTHER_LISTED_URL = "https://ftp.nasdaqtrader.com/dynamic/SymDir/otherlisted.txt"
+SYMBOLS_CACHE_PATH = os.path.join(os.path.dirname(__file__), "data", "nasdaq_symbols.json")
+SYMBOLS_DISK_CACHE = os.environ.get("ARBITER_SYMBOLS_DISK_CACHE", "1") != "0"
 
 # ── Price Sanity ──────────────────────────────────────────────────────────────
 MAX_PRICE_DIVERGENCE = 0.015        # 1.5% max divergence equity vs perp
@@ -101,6 +114,8 @@ DB_PATH = os.path.join(os.path.dirname(__file__), "data", "arbiter.sqlite")
 # ── Scheduling Intervals (seconds) ───────────────────────────────────────────
 MARKET_REFRESH_INTERVAL = 60        # 60s for metaAndAssetCtxs + portfolio build
 SCANNER_INTERVAL = 600              # 10 min for deep EMA refresh + alerts
+HOUSEKEEPING_INTERVAL = 86400       # daily alert pruning + PRAGMA optimize
+HOUSEKEEPING_STARTUP_DELAY = 60     # first housekeeping run this long after start
 
 # ── NYSE Trading Hours (ET) ──────────────────────────────────────────────────
 NYSE_OPEN_HOUR = 9
@@ -120,6 +135,7 @@ OPPORTUNITY_REFIRE_APR_INCREASE = 10.0
 CRITICAL_RESEND_MINUTES = 15
 FUNDING_HURDLE_APR_POINTS = 20.0
 FUNDING_APPROACH_APR_POINTS = 10.0
+ALERT_RETENTION_DAYS = 30           # prune resolved alerts older than this
 
 # ── Pushover (env var override) ───────────────────────────────────────────────
 PUSHOVER_APP_TOKEN = os.environ.get("PUSHOVER_APP_TOKEN", "")
@@ -135,8 +151,13 @@ class BudgetBuckets(TypedDict):
     min_ticket: float
 
 
-def compute_budget_buckets(budget: float) -> BudgetBuckets:
-    """Compute budget-derived portfolio buckets with safe lower bounds."""
+@lru_cache(maxsize=8)
+def compute_budget_buckets(budget: float) -> Mapping[str, float]:
+    """Compute budget-derived portfolio buckets with safe lower bounds.
+
+    Pure in ``budget``, so results are memoized. The returned mapping has the
+    ``BudgetBuckets`` keys and is read-only because it is shared between callers.
+    """
     b = max(float(budget or 0), 0.0)
 
     # Strictly proportional: E = clamp(EMERGENCY_PCT * B, 0, B)
@@ -149,7 +170,7 @@ def compute_budget_buckets(budget: float) -> BudgetBuckets:
     h_max = deployable / (1 + COLLATERAL_FRACTION) if COLLATERAL_FRACTION > 0 else 0.0
     min_ticket = float(ALLOCATION_DUST_USD)  # waterfall: no hard floor, only dust
 
-    return {
+    buckets: BudgetBuckets = {
         "budget": b,
         "emergency": emergency,
         "ops_reserve": ops_reserve,
@@ -157,15 +178,31 @@ def compute_budget_buckets(budget: float) -> BudgetBuckets:
         "h_max": h_max,
         "min_ticket": min_ticket,
     }
+    return MappingProxyType(buckets)
+
+
+# Canonical (interned) HEDGE_MAP keys, for normalize_coin's fast path.
+_CANONICAL_COINS: dict[str, str] = {k: k for k in HEDGE_MAP}
 
 
 def normalize_coin(coin: str) -> str:
     """Normalize a coin identifier: trim whitespace, uppercase the symbol part.
 
     'xyz:sndk' -> 'xyz:SNDK', ' xyz:TSLA ' -> 'xyz:TSLA'
+
+    Results are interned so HEDGE_MAP / NON_STOCK_COINS lookups hit on identity.
     """
+    canonical = _CANONICAL_COINS.get(coin)
+    if canonical is not None:  # fast path: already-normalized mapped coin
+        return canonical
+    return _normalize_coin_slow(coin)
+
+
+@lru_cache(maxsize=1024)
+def _normalize_coin_slow(coin: str) -> str:
+    # The same raw spellings recur every scan, so the string work runs once each
     coin = coin.strip()
-    if ":" in coin:
-        prefix, symbol = coin.split(":", 1)
-        return f"{prefix.strip().lower()}:{symbol.strip().upper()}"
-    return coin.upper()
+    prefix, sep, symbol = coin.partition(":")
+    if sep:
+        return sys.intern(f"{prefix.strip().lower()}:{symbol.strip().upper()}")
+    return sys.intern(coin.upper())
@@ -2,13 +2,18 @@
 
 from __future__ import annotations
 
+import atexit
 import logging
+import os
+import queue
 import sqlite3
 import threading
+import time
+from collections import OrderedDict
+from collections.abc import Iterable
 from contextlib import contextmanager
-from datetime import datetime, timezone
-
-import logging
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
 
 import config
 
@@ -16,47 +21,185 @@ log = logging.getLogger(__name__)
 
 _local = threading.local()
 
+# Prepared-statement cache per connection; sized to hold every hot query/upsert.
+_STATEMENT_CACHE_SIZE = 256
+
+# Read-only connection pools, keyed by DB path so a repointed DB_PATH never
+# hands out a connection to the old file.
+_RO_POOL_SIZE = os.cpu_count() or 4
+_ro_pools: dict[str, queue.Queue] = {}
+_ro_pools_lock = threading.Lock()
+
+# Every thread-local read-write connection, so close_all() can reach them
+_rw_conns: list[sqlite3.Connection] = []
+_rw_conns_lock = threading.Lock()
+
 
 def _get_conn() -> sqlite3.Connection:
-    """Return a thread-local connection with WAL mode enabled."""
+    """Return a thread-local connection with WAL mode and tuned PRAGMAs."""
     if not hasattr(_local, "conn") or _local.conn is None:
-        conn = sqlite3.connect(config.DB_PATH, timeout=10)
+        # isolation_level=None: transactions are managed explicitly in get_db().
+        # Used only by its own thread; check_same_thread=False lets close_all()
+        # close it from whichever thread runs the cleanup.
+        conn = sqlite3.connect(
+            config.DB_PATH, timeout=10, isolation_level=None,
+            check_same_thread=False, cached_statements=_STATEMENT_CACHE_SIZE,
+        )
         conn.execute("PRAGMA journal_mode=WAL")
         conn.execute("PRAGMA busy_timeout=5000")
+        conn.execute("PRAGMA synchronous=NORMAL")       # WAL-safe; fsync only at checkpoint
+        conn.execute("PRAGMA cache_size=-20000")        # 20 MB page cache
+        conn.execute("PRAGMA temp_store=MEMORY")
+        conn.execute("PRAGMA mmap_size=268435456")      # 256 MB memory-mapped I/O
+        conn.execute("PRAGMA wal_autocheckpoint=1000")
+        conn.execute("PRAGMA foreign_keys=ON")
         conn.row_factory = sqlite3.Row
+        with _rw_conns_lock:
+            _rw_conns.append(conn)
         _local.conn = conn
     return _local.conn
 
 
 @contextmanager
 def get_db():
-    """Context manager yielding a sqlite3 connection."""
+    """Context manager yielding a sqlite3 connection inside a write transaction.
+
+    Uses ``BEGIN IMMEDIATE`` so the writer lock is taken up front (and waited
+    on via busy_timeout) instead of upgrading mid-transaction and failing
+    with SQLITE_BUSY.
+    """
     conn = _get_conn()
+    conn.execute("BEGIN IMMEDIATE")
     try:
         yield conn
-        conn.commit()
-    except Exception:
-        conn.rollback()
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
         raise
 
 
+def _ro_pool() -> queue.Queue:
+    """Return the read-only connection pool for the current DB_PATH."""
+    path = config.DB_PATH
+    with _ro_pools_lock:
+        pool = _ro_pools.get(path)
+        if pool is None:
+            pool = queue.Queue(maxsize=_RO_POOL_SIZE)
+            _ro_pools[path] = pool
+        return pool
+
+
+def _open_ro_conn() -> sqlite3.Connection:
+    """Open a read-only connection that never contends for the writer lock."""
+    conn = sqlite3.connect(
+        f"file:{config.DB_PATH}?mode=ro", uri=True, timeout=10,
+        check_same_thread=False, cached_statements=_STATEMENT_CACHE_SIZE,
+    )
+    conn.execute("PRAGMA busy_timeout=5000")
+    conn.execute("PRAGMA cache_size=-20000")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute("PRAGMA mmap_size=268435456")
+    # Plain tuples: _fetch_dicts() builds each row's dict exactly once
+    return conn
+
+
+def close_all():
+    """Close every connection this process opened and forget the pools.
+
+    Covers pooled read-only connections for every DB_PATH used so far and
+    each thread's read-write connection; the next call on any thread opens
+    fresh ones. Closing the last connection also checkpoints the WAL and
+    removes the -wal/-shm files. Registered with atexit.
+    """
+    global _local
+    with _ro_pools_lock:
+        pools = list(_ro_pools.values())
+        _ro_pools.clear()
+    for pool in pools:
+        while True:
+            try:
+                pool.get_nowait().close()
+            except queue.Empty:
+                break
+    with _rw_conns_lock:
+        conns = list(_rw_conns)
+        _rw_conns.clear()
+    for conn in conns:
+        conn.close()
+    _local = threading.local()
+
+
+atexit.register(close_all)
+
+
+def _fetch_dicts(cur: sqlite3.Cursor) -> list[dict]:
+    """Materialize a cursor's rows as dicts, resolving column names once."""
+    names = tuple(d[0] for d in cur.description)
+    return [dict(zip(names, r)) for r in cur.fetchall()]
+
+
+def _fetch_dict(cur: sqlite3.Cursor) -> dict | None:
+    """Materialize a cursor's first row as a dict (None if no row)."""
+    row = cur.fetchone()
+    if row is None:
+        return None
+    return dict(zip((d[0] for d in cur.description), row))
+
+
+@contextmanager
+def get_db_ro():
+    """Context manager borrowing a read-only connection from the pool.
+
+    Use for pure SELECT helpers; writes must go through ``get_db()``.
+    """
+    path = config.DB_PATH
+    pool = _ro_pool()
+    try:
+        conn = pool.get_nowait()
+    except queue.Empty:
+        conn = _open_ro_conn()
+    try:
+        yield conn
+    finally:
+        if _ro_pools.get(path) is not pool:
+            conn.close()  # pool dropped by close_all() while borrowed
+        else:
+            try:
+                pool.put_nowait(conn)
+            except queue.Full:
+                conn.close()
+
+
 def init_db():
     """Create all tables if they don't exist, then apply migrations."""
-    with get_db() as conn:
-        conn.executescript(_SCHEMA)
+    # executescript manages its own statements; run it outside BEGIN IMMEDIATE
+    _get_conn().executescript(_SCHEMA)
     _run_migrations()
+    _start_alert_flusher()
 
 
 # ── Migrations ─────────────────────────────────────────────────────────────
 
-_MIGRATIONS: list[tuple[str, str, str]] = [
-    ("portfolio_targets", "run_status", "TEXT"),
-    ("portfolio_targets", "deep_scan_cohort", "INTEGER DEFAULT 0"),
-    ("portfolio_targets", "projection_coverage", "REAL DEFAULT 0"),
-    ("portfolio_targets", "prefiltered_count", "INTEGER DEFAULT 0"),
-    ("rejected_markets", "instant_apr", "REAL"),
-    ("rejected_markets", "pre_rank", "INTEGER"),
+# Versioned migrations: entry N-1 upgrades a database from user_version N-1
+# to N. Each entry is a list of ALTER TABLE ADD COLUMN steps; steps are
+# skipped when the column already exists so legacy databases that predate
+# user_version tracking upgrade cleanly.
+_MIGRATIONS: list[list[tuple[str, str, str]]] = [
+    # v1
+    [
+        ("portfolio_targets", "run_status", "TEXT"),
+        ("portfolio_targets", "deep_scan_cohort", "INTEGER DEFAULT 0"),
+        ("portfolio_targets", "projection_coverage", "REAL DEFAULT 0"),
+        ("portfolio_targets", "prefiltered_count", "INTEGER DEFAULT 0"),
+        ("rejected_markets", "instant_apr", "REAL"),
+        ("rejected_markets", "pre_rank", "INTEGER"),
+    ],
+    # v2
+    [
+        ("alert_history", "sent_at_ms", "INTEGER"),
+    ],
 ]
+_SCHEMA_VERSION = len(_MIGRATIONS)
 
 
 def _table_columns(conn: sqlite3.Connection, table: str) -> set[str]:
@@ -66,28 +209,77 @@ def _table_columns(conn: sqlite3.Connection, table: str) -> set[str]:
 
 
 def _run_migrations():
-    """Apply pending ALTER TABLE ADD COLUMN migrations (idempotent)."""
+    """Apply pending versioned migrations, tracked via PRAGMA user_version.
+
+    An up-to-date database costs a single pragma read at startup.
+    """
+    conn = _get_conn()
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    if version >= _SCHEMA_VERSION:
+        return
+
     with get_db() as conn:
         cache: dict[str, set[str]] = {}
         applied = 0
-        for table, column, col_def in _MIGRATIONS:
-            if table not in cache:
-                cache[table] = _table_columns(conn, table)
-            if column in cache[table]:
-                continue
-            stmt = f"ALTER TABLE {table} ADD COLUMN {column} {col_def}"
-            conn.execute(stmt)
-            cache[table].add(column)
-            applied += 1
-            log.info("Migration: %s", stmt)
-        if applied:
-            log.info("Applied %d migration(s)", applied)
-
-
-def _now() -> str:
+        for steps in _MIGRATIONS[version:]:
+            for table, column, col_def in steps:
+                if table not in cache:
+                    cache[table] = _table_columns(conn, table)
+                if column in cache[table]:
+                    continue
+                stmt = f"ALTER TABLE {table} ADD COLUMN {column} {col_def}"
+                conn.execute(stmt)
+                cache[table].add(column)
+                applied += 1
+                log.info("Migration: %s", stmt)
+        conn.execute(f"PRAGMA user_version = {_SCHEMA_VERSION}")
+        log.info("Schema v%d -> v%d (%d column(s) added)", version, _SCHEMA_VERSION, applied)
+
+
+def utc_now() -> str:
+    """Current UTC time as ISO-8601, the format stored in ``*_at`` columns.
+
+    Batch writers compute this once per tick and pass it as ``ts`` to the
+    upsert helpers instead of re-formatting a timestamp per row.
+    """
     return datetime.now(timezone.utc).isoformat()
 
 
+@lru_cache(maxsize=64)
+def _upsert_sql(table: str, key: str, cols: tuple[str, ...]) -> str:
+    """Build the INSERT ... ON CONFLICT statement once per (table, column set)."""
+    placeholders = ", ".join("?" for _ in cols)
+    conflict = ", ".join(f"{c} = excluded.{c}" for c in cols if c != key)
+    return (
+        f"INSERT INTO {table} ({', '.join(cols)}) VALUES ({placeholders}) "
+        f"ON CONFLICT({key}) DO UPDATE SET {conflict}"
+    )
+
+
+def _upsert(table: str, key: str, key_val: str, data: dict, ts: str | None = None):
+    """Upsert one row keyed on ``key``; stamps updated_at with ``ts`` (default: now)."""
+    row = {**data, key: key_val, "updated_at": ts or utc_now()}
+    with get_db() as conn:
+        conn.execute(_upsert_sql(table, key, tuple(row)), tuple(row.values()))
+
+
+def _upsert_many(
+    conn: sqlite3.Connection, table: str, key: str,
+    rows: Iterable[tuple[str, dict]], ts: str | None = None,
+):
+    """executemany counterpart of _upsert for (key_val, data) pairs on an open transaction.
+
+    Rows are grouped by column set so each distinct statement runs once.
+    """
+    stamp = ts or utc_now()
+    batches: dict[tuple[str, ...], list[tuple]] = {}
+    for key_val, data in rows:
+        row = {**data, key: key_val, "updated_at": stamp}
+        batches.setdefault(tuple(row), []).append(tuple(row.values()))
+    for cols, params in batches.items():
+        conn.executemany(_upsert_sql(table, key, cols), params)
+
+
 # ── Schema ──────────────────────────────────────────────────────────────────
 
 _SCHEMA = """
@@ -197,9 +389,18 @@ CREATE TABLE IF NOT EXISTS alert_history (
     severity     TEXT NOT NULL,
     message      TEXT NOT NULL,
     sent_at      TEXT,
+    sent_at_ms   INTEGER,
     acknowledged INTEGER NOT NULL DEFAULT 0
 );
 
+-- Dedup lookup in get_last_alert: WHERE ticker, severity ORDER BY sent_at DESC
+CREATE INDEX IF NOT EXISTS idx_alert_ticker_sev_time
+    ON alert_history (ticker, severity, sent_at DESC);
+
+-- get_unacknowledged_criticals only ever scans unacknowledged rows
+CREATE INDEX IF NOT EXISTS idx_alert_sev_unack
+    ON alert_history (severity, sent_at DESC) WHERE acknowledged = 0;
+
 CREATE TABLE IF NOT EXISTS insurance_covers (
     id          INTEGER PRIMARY KEY AUTOINCREMENT,
     provider    TEXT NOT NULL DEFAULT 'Nexus Mutual',
@@ -253,15 +454,14 @@ INSERT OR IGNORE INTO implemented_cash (id) VALUES (1);
 # ── User Inputs CRUD ────────────────────────────────────────────────────────
 
 def get_user_inputs() -> dict:
-    with get_db() as conn:
-        row = conn.execute("SELECT * FROM user_inputs WHERE id = 1").fetchone()
-        return dict(row) if row else {}
+    with get_db_ro() as conn:
+        return _fetch_dict(conn.execute("SELECT * FROM user_inputs WHERE id = 1")) or {}
 
 
 def update_user_inputs(**kwargs):
     if not kwargs:
         return
-    kwargs["updated_at"] = _now()
+    kwargs["updated_at"] = utc_now()
     sets = ", ".join(f"{k} = ?" for k in kwargs)
     vals = list(kwargs.values())
     with get_db() as conn:
@@ -270,34 +470,28 @@ def update_user_inputs(**kwargs):
 
 # ── Market Snapshots CRUD ───────────────────────────────────────────────────
 
-def upsert_market_snapshot(ticker: str, data: dict):
-    data["ticker"] = ticker
-    data["updated_at"] = _now()
-    cols = ", ".join(data.keys())
-    placeholders = ", ".join("?" for _ in data)
-    conflict = ", ".join(f"{k} = excluded.{k}" for k in data if k != "ticker")
+def upsert_market_snapshot(ticker: str, data: dict, ts: str | None = None):
+    _upsert("market_snapshots", "ticker", ticker, data, ts)
+
+
+def upsert_market_snapshots(rows: Iterable[tuple[str, dict]], ts: str | None = None):
+    """Upsert many (ticker, data) snapshots in one transaction."""
     with get_db() as conn:
-        conn.execute(
-            f"INSERT INTO market_snapshots ({cols}) VALUES ({placeholders}) "
-            f"ON CONFLICT(ticker) DO UPDATE SET {conflict}",
-            list(data.values()),
-        )
+        _upsert_many(conn, "market_snapshots", "ticker", rows, ts)
 
 
 def get_market_snapshot(ticker: str) -> dict | None:
-    with get_db() as conn:
-        row = conn.execute(
+    with get_db_ro() as conn:
+        return _fetch_dict(conn.execute(
             "SELECT * FROM market_snapshots WHERE ticker = ?", (ticker,)
-        ).fetchone()
-        return dict(row) if row else None
+        ))
 
 
 def get_all_market_snapshots() -> list[dict]:
-    with get_db() as conn:
-        rows = conn.execute(
+    with get_db_ro() as conn:
+        return _fetch_dicts(conn.execute(
             "SELECT * FROM market_snapshots ORDER BY funding_apr DESC"
-        ).fetchall()
-        return [dict(r) for r in rows]
+        ))
 
 
 # ── Funding History CRUD ────────────────────────────────────────────────────
@@ -312,12 +506,11 @@ def upsert_funding_history(ticker: str, timestamp: str, rate: float, apr: float)
 
 
 def get_funding_history(ticker: str, limit: int = 200) -> list[dict]:
-    with get_db() as conn:
-        rows = conn.execute(
+    with get_db_ro() as conn:
+        return _fetch_dicts(conn.execute(
             "SELECT * FROM funding_history WHERE ticker = ? ORDER BY timestamp ASC LIMIT ?",
             (ticker, limit),
-        ).fetchall()
-        return [dict(r) for r in rows]
+        ))
 
 
 # ── Funding Epochs 8h CRUD ──────────────────────────────────────────────────
@@ -331,37 +524,87 @@ def upsert_funding_epoch_8h(coin: str, epoch_ts: str, rate_8h: float, apr: float
         )
 
 
-def get_funding_epochs_8h(coin: str, limit: int = 84) -> list[dict]:
+def upsert_funding_epoch_8h_many(rows: list[tuple[str, str, float, float, bool]]):
+    """Bulk upsert of (coin, epoch_ts, rate_8h, apr, is_weekend) rows in one transaction.
+
+    Rows may span many coins; the scanner flushes a whole deep scan at once.
+    """
+    if not rows:
+        return
     with get_db() as conn:
-        rows = conn.execute(
+        conn.executemany(
+            "INSERT INTO funding_epochs_8h (coin, epoch_ts, rate_8h, apr, is_weekend) "
+            "VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT(coin, epoch_ts) DO UPDATE SET "
+            "rate_8h = excluded.rate_8h, apr = excluded.apr, is_weekend = excluded.is_weekend",
+            rows,  # sqlite3 stores bool is_weekend as 0/1
+        )
+
+
+def get_funding_epochs_8h(coin: str, limit: int = 84) -> list[dict]:
+    with get_db_ro() as conn:
+        return _fetch_dicts(conn.execute(
             "SELECT * FROM funding_epochs_8h WHERE coin = ? ORDER BY epoch_ts ASC LIMIT ?",
             (coin, limit),
-        ).fetchall()
-        return [dict(r) for r in rows]
+        ))
+
+
+def get_recent_funding_epochs_8h_many(coins: list[str], limit: int = 84) -> dict[str, list[dict]]:
+    """The latest ``limit`` stored epochs per coin (oldest first), in one query.
+
+    Coins with no stored epochs are absent from the result.
+    """
+    if not coins:
+        return {}
+    placeholders = ",".join("?" * len(coins))
+    with get_db_ro() as conn:
+        rows = _fetch_dicts(conn.execute(
+            "SELECT coin, epoch_ts, rate_8h, apr, is_weekend FROM ("
+            "  SELECT *, ROW_NUMBER() OVER (PARTITION BY coin ORDER BY epoch_ts DESC) AS rn"
+            f"  FROM funding_epochs_8h WHERE coin IN ({placeholders})"
+            ") WHERE rn <= ? ORDER BY coin, epoch_ts ASC",
+            (*coins, limit),
+        ))
+    by_coin: dict[str, list[dict]] = {}
+    for r in rows:
+        by_coin.setdefault(r["coin"], []).append(r)
+    return by_coin
 
 
 # ── EMA Cache CRUD ──────────────────────────────────────────────────────────
 
-def upsert_ema(ticker: str, ema_3d: float, ema_7d: float):
+def upsert_ema(ticker: str, ema_3d: float, ema_7d: float, ts: str | None = None):
     with get_db() as conn:
         conn.execute(
             "INSERT OR REPLACE INTO ema_cache (ticker, ema_3d, ema_7d, updated_at) VALUES (?, ?, ?, ?)",
-            (ticker, ema_3d, ema_7d, _now()),
+            (ticker, ema_3d, ema_7d, ts or utc_now()),
         )
 
 
-def get_ema(ticker: str) -> dict | None:
+def upsert_ema_many(rows: list[tuple[str, float, float]], ts: str | None = None):
+    """Bulk upsert of (ticker, ema_3d, ema_7d) rows in one transaction."""
+    if not rows:
+        return
+    stamp = ts or utc_now()
     with get_db() as conn:
-        row = conn.execute(
+        conn.executemany(
+            "INSERT OR REPLACE INTO ema_cache (ticker, ema_3d, ema_7d, updated_at) VALUES (?, ?, ?, ?)",
+            [(t, e3, e7, stamp) for t, e3, e7 in rows],
+        )
+
+
+def get_ema(ticker: str) -> dict | None:
+    with get_db_ro() as conn:
+        return _fetch_dict(conn.execute(
             "SELECT ema_3d, ema_7d FROM ema_cache WHERE ticker = ?", (ticker,)
-        ).fetchone()
-        return dict(row) if row else None
+        ))
 
 
-def get_all_emas() -> dict[str, dict]:
-    with get_db() as conn:
+def get_all_emas() -> dict[str, tuple[float, float]]:
+    """Map coin -> (ema_3d, ema_7d)."""
+    with get_db_ro() as conn:
         rows = conn.execute("SELECT ticker, ema_3d, ema_7d FROM ema_cache").fetchall()
-        return {r["ticker"]: {"ema_3d": r["ema_3d"], "ema_7d": r["ema_7d"]} for r in rows}
+        return {t: (e3, e7) for t, e3, e7 in rows}
 
 
 # ── Portfolio Targets CRUD ──────────────────────────────────────────────────
@@ -369,7 +612,7 @@ def get_all_emas() -> dict[str, dict]:
 def update_portfolio_targets(**kwargs):
     if not kwargs:
         return
-    kwargs["updated_at"] = _now()
+    kwargs["updated_at"] = utc_now()
     sets = ", ".join(f"{k} = ?" for k in kwargs)
     vals = list(kwargs.values())
     with get_db() as conn:
@@ -377,9 +620,8 @@ def update_portfolio_targets(**kwargs):
 
 
 def get_portfolio_targets() -> dict:
-    with get_db() as conn:
-        row = conn.execute("SELECT * FROM portfolio_targets WHERE id = 1").fetchone()
-        return dict(row) if row else {}
+    with get_db_ro() as conn:
+        return _fetch_dict(conn.execute("SELECT * FROM portfolio_targets WHERE id = 1")) or {}
 
 
 # ── Portfolio Positions CRUD ────────────────────────────────────────────────
@@ -389,26 +631,25 @@ def clear_portfolio_positions():
         conn.execute("DELETE FROM portfolio_positions")
 
 
-def upsert_portfolio_position(coin: str, data: dict):
-    data["coin"] = coin
-    data["updated_at"] = _now()
-    cols = ", ".join(data.keys())
-    placeholders = ", ".join("?" for _ in data)
-    conflict = ", ".join(f"{k} = excluded.{k}" for k in data if k != "coin")
+def upsert_portfolio_position(coin: str, data: dict, ts: str | None = None):
+    _upsert("portfolio_positions", "coin", coin, data, ts)
+
+
+def replace_portfolio_positions(rows: Iterable[tuple[str, dict]], ts: str | None = None):
+    """Swap in a new set of (coin, data) positions in one transaction.
+
+    Readers see either the old portfolio or the new one, never an empty table.
+    """
     with get_db() as conn:
-        conn.execute(
-            f"INSERT INTO portfolio_positions ({cols}) VALUES ({placeholders}) "
-            f"ON CONFLICT(coin) DO UPDATE SET {conflict}",
-            list(data.values()),
-        )
+        conn.execute("DELETE FROM portfolio_positions")
+        _upsert_many(conn, "portfolio_positions", "coin", rows, ts)
 
 
 def get_portfolio_positions() -> list[dict]:
-    with get_db() as conn:
-        rows = conn.execute(
+    with get_db_ro() as conn:
+        return _fetch_dicts(conn.execute(
             "SELECT * FROM portfolio_positions ORDER BY rank ASC"
-        ).fetchall()
-        return [dict(r) for r in rows]
+        ))
 
 
 # ── Rejected Markets CRUD ──────────────────────────────────────────────────
@@ -418,53 +659,204 @@ def clear_rejected_markets():
         conn.execute("DELETE FROM rejected_markets")
 
 
-def upsert_rejected_market(coin: str, data: dict):
-    data["coin"] = coin
-    data["updated_at"] = _now()
-    cols = ", ".join(data.keys())
-    placeholders = ", ".join("?" for _ in data)
-    conflict = ", ".join(f"{k} = excluded.{k}" for k in data if k != "coin")
+def upsert_rejected_market(coin: str, data: dict, ts: str | None = None):
+    _upsert("rejected_markets", "coin", coin, data, ts)
+
+
+def replace_rejected_markets(rows: Iterable[tuple[str, dict]], ts: str | None = None):
+    """Swap in a new set of (coin, data) rejected markets in one transaction."""
     with get_db() as conn:
-        conn.execute(
-            f"INSERT INTO rejected_markets ({cols}) VALUES ({placeholders}) "
-            f"ON CONFLICT(coin) DO UPDATE SET {conflict}",
-            list(data.values()),
-        )
+        conn.execute("DELETE FROM rejected_markets")
+        _upsert_many(conn, "rejected_markets", "coin", rows, ts)
 
 
 def get_rejected_markets() -> list[dict]:
-    with get_db() as conn:
-        rows = conn.execute(
+    with get_db_ro() as conn:
+        return _fetch_dicts(conn.execute(
             "SELECT * FROM rejected_markets ORDER BY forecast_apr DESC"
-        ).fetchall()
-        return [dict(r) for r in rows]
+        ))
 
 
 # ── Alert History CRUD ──────────────────────────────────────────────────────
 
-def insert_alert(ticker: str | None, severity: str, message: str):
-    with get_db() as conn:
-        conn.execute(
-            "INSERT INTO alert_history (ticker, severity, message, sent_at) VALUES (?, ?, ?, ?)",
-            (ticker, severity, message, _now()),
+# Dedup lookups fire far more often than alerts are written. Cache the last
+# alert per (ticker, severity); writes in this process evict. Writes from other
+# processes (an acknowledgement made outside the worker) stay invisible until
+# the TTL expires, which is as long as the resend window, so CRITICAL rows,
+# whose acknowledged flag stops resends, are never cached and always re-read.
+_LAST_ALERT_TTL = min(
+    config.OPPORTUNITY_DEDUP_HOURS * 3600, config.CRITICAL_RESEND_MINUTES * 60,
+)
+_LAST_ALERT_CACHE_SIZE = 256
+_last_alert_cache: OrderedDict[tuple[str, str, str], tuple[float, dict | None]] = OrderedDict()
+# Alerts queued by insert_alert but not yet written, keyed like the cache.
+# Kept out of the LRU so neither eviction nor invalidation can drop dedup
+# state that is not on disk yet; _write_alerts removes them.
+_pending_alerts: dict[tuple[str, str, str], dict] = {}
+# Bumped on every alert write or invalidation; a read-through result is only
+# cached if no write landed while its DB read was in flight.
+_last_alert_gen = 0
+_last_alert_lock = threading.Lock()
+
+
+def _invalidate_last_alert(ticker: str | None = None, severity: str | None = None):
+    """Evict cached last-alert entries (all of them when ticker is None).
+
+    Pending (unflushed) alerts are not touched.
+    """
+    global _last_alert_gen
+    with _last_alert_lock:
+        _last_alert_gen += 1
+        if ticker is None:
+            _last_alert_cache.clear()
+        else:
+            _last_alert_cache.pop((config.DB_PATH, ticker, severity), None)
+
+
+# Alert rows are queued and written in batches by a background flusher so an
+# alert storm costs one commit instead of one per alert.
+_ALERT_FLUSH_INTERVAL = 2.0   # seconds to wait for more rows after the first
+_ALERT_FLUSH_BATCH = 100      # max rows per transaction
+_alert_queue: queue.SimpleQueue[tuple[str | None, str, str, str, int]] = queue.SimpleQueue()
+_alert_queued = threading.Event()      # at least one row is waiting
+_alert_batch_full = threading.Event()  # a full batch is waiting; flush now
+_alert_flush_lock = threading.Lock()   # rows leave the queue only under this lock
+_alert_flusher: threading.Thread | None = None
+_alert_flusher_lock = threading.Lock()
+
+
+def _write_alerts(batch: list[tuple[str | None, str, str, str, int]]):
+    """Insert queued alert rows in one transaction, then drop their pending entries."""
+    with get_db() as conn:
+        conn.executemany(
+            "INSERT INTO alert_history (ticker, severity, message, sent_at, sent_at_ms) "
+            "VALUES (?, ?, ?, ?, ?)",
+            batch,
         )
+    # Drop only pending entries for a row from this batch: a newer alert
+    # queued meanwhile stays pending until its own batch lands.
+    global _last_alert_gen
+    with _last_alert_lock:
+        _last_alert_gen += 1
+        for ticker, severity, _, _, sent_at_ms in batch:
+            key = (config.DB_PATH, ticker, severity)
+            pending = _pending_alerts.get(key)
+            if pending is not None and pending["sent_at_ms"] == sent_at_ms:
+                del _pending_alerts[key]
+            _last_alert_cache.pop(key, None)
+
+
+def flush_alerts():
+    """Synchronously write every queued alert row.
+
+    Returns only once rows queued before the call are committed, including
+    any batch the background flusher is writing concurrently.
+    """
+    with _alert_flush_lock:
+        while True:
+            batch = []
+            while len(batch) < _ALERT_FLUSH_BATCH:
+                try:
+                    batch.append(_alert_queue.get_nowait())
+                except queue.Empty:
+                    break
+            if not batch:
+                return
+            _write_alerts(batch)
+
+
+def _alert_flush_loop():
+    while True:
+        _alert_queued.wait()
+        _alert_batch_full.wait(_ALERT_FLUSH_INTERVAL)
+        _alert_queued.clear()
+        _alert_batch_full.clear()
+        try:
+            flush_alerts()
+        except Exception:
+            log.exception("Failed to write queued alerts")
+
+
+def _start_alert_flusher():
+    """Start the background alert flusher once per process."""
+    global _alert_flusher
+    with _alert_flusher_lock:
+        if _alert_flusher is not None and _alert_flusher.is_alive():
+            return
+        _alert_flusher = threading.Thread(
+            target=_alert_flush_loop, name="alert-flusher", daemon=True,
+        )
+        _alert_flusher.start()
+        atexit.register(flush_alerts)
+
+
+def insert_alert(ticker: str | None, severity: str, message: str):
+    """Queue an alert row for the background flusher.
+
+    The row is visible to get_last_alert immediately (as a pending entry)
+    so dedup never misses an alert that has not been flushed yet.
+    """
+    now = datetime.now(timezone.utc)
+    sent_at = now.isoformat()
+    sent_at_ms = int(now.timestamp() * 1000)
+    pending = {"sent_at": sent_at, "sent_at_ms": sent_at_ms, "acknowledged": 0}
+    # Publish before queueing so the flusher can't write the row first
+    global _last_alert_gen
+    with _last_alert_lock:
+        _last_alert_gen += 1
+        key = (config.DB_PATH, ticker, severity)
+        _pending_alerts[key] = pending
+        _last_alert_cache.pop(key, None)
+    _alert_queue.put((ticker, severity, message, sent_at, sent_at_ms))
+    _alert_queued.set()
+    if _alert_queue.qsize() >= _ALERT_FLUSH_BATCH:
+        _alert_batch_full.set()
 
 
 def get_last_alert(ticker: str, severity: str) -> dict | None:
-    with get_db() as conn:
-        row = conn.execute(
-            "SELECT * FROM alert_history WHERE ticker = ? AND severity = ? ORDER BY sent_at DESC LIMIT 1",
+    """Return the dedup fields (sent_at, sent_at_ms, acknowledged) of the most
+    recent alert for (ticker, severity), TTL-cached except for CRITICAL.
+
+    The returned dict is shared with the cache — treat it as read-only.
+    """
+    key = (config.DB_PATH, ticker, severity)
+    now = time.monotonic()
+    with _last_alert_lock:
+        pending = _pending_alerts.get(key)
+        if pending is not None:
+            return pending
+        hit = _last_alert_cache.get(key)
+        if hit is not None and now - hit[0] < _LAST_ALERT_TTL:
+            _last_alert_cache.move_to_end(key)
+            return hit[1]
+        gen = _last_alert_gen
+
+    with get_db_ro() as conn:
+        row = _fetch_dict(conn.execute(
+            "SELECT sent_at, sent_at_ms, acknowledged FROM alert_history "
+            "WHERE ticker = ? AND severity = ? ORDER BY sent_at DESC LIMIT 1",
             (ticker, severity),
-        ).fetchone()
-        return dict(row) if row else None
+        ))
+
+    with _last_alert_lock:
+        # An alert queued during the read is newer than `row`; one written
+        # or invalidated since `gen` may make `row` stale, so don't cache it.
+        pending = _pending_alerts.get(key)
+        if pending is not None:
+            return pending
+        if gen == _last_alert_gen and severity != "CRITICAL":
+            _last_alert_cache[key] = (now, row)
+            _last_alert_cache.move_to_end(key)
+            while len(_last_alert_cache) > _LAST_ALERT_CACHE_SIZE:
+                _last_alert_cache.popitem(last=False)
+    return row
 
 
 def get_unacknowledged_criticals() -> list[dict]:
-    with get_db() as conn:
-        rows = conn.execute(
+    with get_db_ro() as conn:
+        return _fetch_dicts(conn.execute(
             "SELECT * FROM alert_history WHERE severity = 'CRITICAL' AND acknowledged = 0 ORDER BY sent_at DESC"
-        ).fetchall()
-        return [dict(r) for r in rows]
+        ))
 
 
 def acknowledge_alert(alert_id: int):
@@ -472,6 +864,28 @@ def acknowledge_alert(alert_id: int):
         conn.execute(
             "UPDATE alert_history SET acknowledged = 1 WHERE id = ?", (alert_id,)
         )
+    _invalidate_last_alert()
+
+
+def prune_alert_history(days: int = config.ALERT_RETENTION_DAYS) -> int:
+    """Delete resolved alerts older than ``days``; returns the number removed.
+
+    Unacknowledged CRITICAL alerts are kept regardless of age.
+    """
+    cutoff = (datetime.now(timezone.utc) - timedelta(days=days)).isoformat()
+    with get_db() as conn:
+        cur = conn.execute(
+            "DELETE FROM alert_history WHERE sent_at < ? "
+            "AND (acknowledged = 1 OR severity != 'CRITICAL')",
+            (cutoff,),
+        )
+    _invalidate_last_alert()
+    return cur.rowcount
+
+
+def optimize():
+    """Refresh query-planner statistics (cheap; run periodically)."""
+    _get_conn().execute("PRAGMA optimize")
 
 
 # ── Insurance Covers CRUD ──────────────────────────────────────────────────
@@ -481,16 +895,15 @@ def insert_insurance_cover(cover_type: str, amount: float, expiry_date: str, pro
         conn.execute(
             "INSERT INTO insurance_covers (provider, cover_type, amount, expiry_date, created_at) "
             "VALUES (?, ?, ?, ?, ?)",
-            (provider, cover_type, amount, expiry_date, _now()),
+            (provider, cover_type, amount, expiry_date, utc_now()),
         )
 
 
 def get_insurance_covers() -> list[dict]:
-    with get_db() as conn:
-        rows = conn.execute(
+    with get_db_ro() as conn:
+        return _fetch_dicts(conn.execute(
             "SELECT * FROM insurance_covers ORDER BY expiry_date ASC"
-        ).fetchall()
-        return [dict(r) for r in rows]
+        ))
 
 
 def delete_insurance_cover(cover_id: int):
@@ -504,32 +917,21 @@ def insert_opportunity(ticker: str, ema_apr: float, advantage_apr: float):
     with get_db() as conn:
         conn.execute(
             "INSERT INTO opportunity_log (ticker, ema_apr, advantage_apr, triggered_at) VALUES (?, ?, ?, ?)",
-            (ticker, ema_apr, advantage_apr, _now()),
+            (ticker, ema_apr, advantage_apr, utc_now()),
         )
 
 
 # ── Implemented Positions CRUD ────────────────────────────────────────────
 
-def upsert_implemented_position(coin: str, data: dict):
-    data["coin"] = coin
-    data["updated_at"] = _now()
-    cols = ", ".join(data.keys())
-    placeholders = ", ".join("?" for _ in data)
-    conflict = ", ".join(f"{k} = excluded.{k}" for k in data if k != "coin")
-    with get_db() as conn:
-        conn.execute(
-            f"INSERT INTO implemented_positions ({cols}) VALUES ({placeholders}) "
-            f"ON CONFLICT(coin) DO UPDATE SET {conflict}",
-            list(data.values()),
-        )
+def upsert_implemented_position(coin: str, data: dict, ts: str | None = None):
+    _upsert("implemented_positions", "coin", coin, data, ts)
 
 
 def get_implemented_positions() -> list[dict]:
-    with get_db() as conn:
-        rows = conn.execute(
+    with get_db_ro() as conn:
+        return _fetch_dicts(conn.execute(
             "SELECT * FROM implemented_positions ORDER BY coin ASC"
-        ).fetchall()
-        return [dict(r) for r in rows]
+        ))
 
 
 def delete_implemented_position(coin: str):
@@ -547,7 +949,7 @@ def clear_implemented_positions():
 def update_implemented_cash(**kwargs):
     if not kwargs:
         return
-    kwargs["updated_at"] = _now()
+    kwargs["updated_at"] = utc_now()
     sets = ", ".join(f"{k} = ?" for k in kwargs)
     vals = list(kwargs.values())
     with get_db() as conn:
@@ -555,9 +957,8 @@ def update_implemented_cash(**kwargs):
 
 
 def get_implemented_cash() -> dict:
-    with get_db() as conn:
-        row = conn.execute("SELECT * FROM implemented_cash WHERE id = 1").fetchone()
-        return dict(row) if row else {}
+    with get_db_ro() as conn:
+        return _fetch_dict(conn.execute("SELECT * FROM implemented_cash WHERE id = 1")) or {}
 
 
 # ── Rebalance Decisions CRUD ──────────────────────────────────────────────
@@ -565,7 +966,7 @@ def get_implemented_cash() -> dict:
 def update_rebalance_decision(**kwargs):
     if not kwargs:
         return
-    kwargs["updated_at"] = _now()
+    kwargs["updated_at"] = utc_now()
     sets = ", ".join(f"{k} = ?" for k in kwargs)
     vals = list(kwargs.values())
     with get_db() as conn:
@@ -573,6 +974,5 @@ def update_rebalance_decision(**kwargs):
 
 
 def get_rebalance_decision() -> dict:
-    with get_db() as conn:
-        row = conn.execute("SELECT * FROM rebalance_decisions WHERE id = 1").fetchone()
-        return dict(row) if row else {}
+    with get_db_ro() as conn:
+        return _fetch_dict(conn.execute("SELECT * FROM rebalance_decisions WHERE id = 1")) or {}
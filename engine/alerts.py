@@ -2,8 +2,11 @@
 
 from __future__ import annotations
 
+import atexit
 import logging
-from datetime import datetime, timedelta, timezone
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timezone
 
 import httpx
 
@@ -14,20 +17,46 @@ log = logging.getLogger(__name__)
 
 PUSHOVER_API_URL = "https://api.pushover.net/1/messages.json"
 
+_OPPORTUNITY_DEDUP_MS = config.OPPORTUNITY_DEDUP_HOURS * 3_600_000
+_CRITICAL_RESEND_MS = config.CRITICAL_RESEND_MINUTES * 60_000
+
+# Shared keep-alive client so the TLS handshake is paid once, and a small
+# executor so alert delivery never blocks the scanner thread.
+_PUSHOVER_CLIENT = httpx.Client(
+    timeout=10, limits=httpx.Limits(max_keepalive_connections=4),
+)
+_PUSHOVER_EXECUTOR = ThreadPoolExecutor(max_workers=2, thread_name_prefix="pushover")
+# atexit runs LIFO: deliver queued alerts first, then close the client
+atexit.register(_PUSHOVER_CLIENT.close)
+atexit.register(_PUSHOVER_EXECUTOR.shutdown, wait=True)
+
 
 def _pushover_configured() -> bool:
     return bool(config.PUSHOVER_APP_TOKEN and config.PUSHOVER_USER_KEY)
 
 
-def _send_pushover(title: str, message: str, priority: int = 0, **kwargs):
-    """Send a Pushover notification.
+def _post_pushover(payload: dict) -> bool:
+    """POST a Pushover payload on the shared client (runs on the executor)."""
+    try:
+        resp = _PUSHOVER_CLIENT.post(PUSHOVER_API_URL, data=payload)
+        resp.raise_for_status()
+        return True
+    except Exception as e:
+        log.error("Pushover send failed: %s", e)
+        return False
+
+
+def _send_pushover(title: str, message: str, priority: int = 0, **kwargs) -> Future[bool] | None:
+    """Queue a Pushover notification for background delivery.
 
     priority: -2 (silent), -1 (quiet), 0 (normal), 1 (high), 2 (emergency)
     Emergency (2) requires retry and expire parameters.
+    Returns a Future resolving to whether Pushover accepted the message,
+    or None when Pushover is not configured.
     """
     if not _pushover_configured():
         log.info("Pushover not configured — skipping: %s", title)
-        return False
+        return None
 
     payload = {
         "token": config.PUSHOVER_APP_TOKEN,
@@ -41,13 +70,7 @@ def _send_pushover(title: str, message: str, priority: int = 0, **kwargs):
         payload["expire"] = kwargs.get("expire", 3600)  # 1 hour expire
     payload.update(kwargs)
 
-    try:
-        resp = httpx.post(PUSHOVER_API_URL, data=payload, timeout=10)
-        resp.raise_for_status()
-        return True
-    except Exception as e:
-        log.error("Pushover send failed: %s", e)
-        return False
+    return _PUSHOVER_EXECUTOR.submit(_post_pushover, payload)
 
 
 def _should_send(ticker: str, severity: str, advantage_apr: float = 0) -> bool:
@@ -56,16 +79,18 @@ def _should_send(ticker: str, severity: str, advantage_apr: float = 0) -> bool:
     if not last:
         return True
 
-    last_time = datetime.fromisoformat(last["sent_at"])
-    now = datetime.now(timezone.utc)
+    last_ms = last.get("sent_at_ms")
+    if last_ms is None:  # rows written before sent_at_ms existed
+        last_ms = int(datetime.fromisoformat(last["sent_at"]).timestamp() * 1000)
+    age_ms = int(time.time() * 1000) - last_ms
 
     if severity == "OPPORTUNITY":
-        if now - last_time < timedelta(hours=config.OPPORTUNITY_DEDUP_HOURS):
+        if age_ms < _OPPORTUNITY_DEDUP_MS:
             return False
     elif severity == "CRITICAL":
         if last.get("acknowledged"):
             return False
-        if now - last_time < timedelta(minutes=config.CRITICAL_RESEND_MINUTES):
+        if age_ms < _CRITICAL_RESEND_MS:
             return False
 
     return True
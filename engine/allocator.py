@@ -3,11 +3,15 @@
 from __future__ import annotations
 
 from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import NamedTuple
+
+import numpy as np
 
 import config
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class Position:
     """A single position in the target portfolio."""
     coin: str
@@ -32,10 +36,10 @@ class Position:
     weekend_mult: float
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class Portfolio:
     """The complete target portfolio."""
-    positions: list[Position]
+    positions: tuple[Position, ...]  # tuple: cached Portfolios are shared
     budget: float
     emergency: float
     deployable: float
@@ -49,9 +53,41 @@ class Portfolio:
     num_positions: int
 
 
+class _CandidateKey(NamedTuple):
+    """The candidate fields build_portfolio reads; hashable, so usable as a cache key."""
+    coin: str
+    ticker: str
+    hedge_symbol: str
+    cap_oi: float
+    cap_vol: float
+    cap_impact: float
+    forecast_apr: float
+    score: float
+    slippage_drag_apr: float
+    fee_drag_apr: float
+    ema_3d: float
+    ema_7d: float
+    weekend_mult: float
+
+
+def _fingerprint(candidates: list) -> tuple[_CandidateKey, ...]:
+    return tuple(
+        _CandidateKey(
+            c.coin, c.ticker, c.hedge_symbol, c.cap_oi, c.cap_vol, c.cap_impact,
+            c.forecast_apr, c.score, c.slippage_drag_apr, c.fee_drag_apr,
+            c.ema_3d, c.ema_7d, c.weekend_mult,
+        )
+        for c in candidates
+    )
+
+
 def build_portfolio(candidates: list, budget: float) -> Portfolio:
     """Build multi-asset portfolio using greedy water-fill allocation.
 
+    Memoized on the content of ``candidates`` and ``budget``: an unchanged
+    scan returns the previous Portfolio, which is fully immutable
+    (frozen, with positions as a tuple) so sharing it is safe.
+
     Args:
         candidates: list of scanner.Candidate objects, pre-sorted by score desc
         budget: total capital (USD)
@@ -63,7 +99,14 @@ def build_portfolio(candidates: list, budget: float) -> Portfolio:
         4. alloc = min(cap_final, remaining)
         5. Skip if alloc < ALLOCATION_DUST_USD ($100)
         6. Continue until MAX_NAMES or budget exhausted
+
+    Steps 2-6 are evaluated as vector prefix sums rather than a Python loop.
     """
+    return _build_portfolio(_fingerprint(candidates), budget)
+
+
+@lru_cache(maxsize=8)
+def _build_portfolio(candidates: tuple[_CandidateKey, ...], budget: float) -> Portfolio:
     buckets = config.compute_budget_buckets(budget)
     emergency = buckets["emergency"]
     deployable = buckets["deployable"]
@@ -75,37 +118,63 @@ def build_portfolio(candidates: list, budget: float) -> Portfolio:
     if h_max <= 0:
         return _empty_portfolio(budget, emergency, deployable, h_max)
 
-    remaining = h_max
-    positions = []
-
-    for cand in candidates:
-        if len(positions) >= config.MAX_NAMES:
-            break
-        if remaining <= dust:
-            break
-
-        cap_conc = config.MAX_CONCENTRATION * h_max
-        cap_final = min(cand.cap_oi, cand.cap_vol, cand.cap_impact, cap_conc)
-        alloc = min(cap_final, remaining)
-
-        if alloc < dust:
-            continue
+    # Caps as parallel arrays: the per-candidate min runs in C.
+    n = len(candidates)
+    cap_oi = np.fromiter((c.cap_oi for c in candidates), dtype=np.float64, count=n)
+    cap_vol = np.fromiter((c.cap_vol for c in candidates), dtype=np.float64, count=n)
+    cap_impact = np.fromiter((c.cap_impact for c in candidates), dtype=np.float64, count=n)
+    cap_conc = config.MAX_CONCENTRATION * h_max
+    cap_final = np.minimum(np.minimum(cap_oi, cap_vol), np.minimum(cap_impact, cap_conc))
+
+    # Water-fill as prefix sums. Candidates whose cap is below dust are always
+    # skipped, so drop them first. Each remaining candidate j sees
+    # rem_before[j] = h_max - (sum of earlier caps); it takes its full cap
+    # while that fits, the first one that doesn't fit takes what is left, and
+    # the fill stops once the remainder is within dust or MAX_NAMES is hit.
+    eligible = np.flatnonzero(cap_final >= dust)
+    caps = cap_final[eligible]
+    cs = np.cumsum(caps)
+    rem_before = h_max - np.concatenate(([0.0], cs))[:-1]
+    allocs = np.minimum(caps, rem_before)
+    n_full = int(np.searchsorted(cs, h_max, side="right"))
+    n_live = int(np.count_nonzero(rem_before > dust))  # rem_before is non-increasing
+    n_take = min(n_live, n_full + 1, config.MAX_NAMES)
+
+    taken = eligible[:n_take]
+    bindings = _binding_caps(
+        cap_oi[taken], cap_vol[taken], cap_impact[taken], cap_conc, rem_before[:n_take],
+    )
 
-        # Determine which cap was binding
-        binding = _binding_cap(alloc, cand.cap_oi, cand.cap_vol, cand.cap_impact, cap_conc, remaining)
+    # Round every numeric column in one call, then compute shares of H from
+    # the rounded allocations (matching what is persisted and displayed).
+    alloc_r, cap_oi_r, cap_vol_r, cap_impact_r, cap_final_r = np.round(np.vstack((
+        allocs[:n_take], cap_oi[taken], cap_vol[taken], cap_impact[taken], cap_final[taken],
+    )), 2)
+    h_total = float(alloc_r.sum())
+    if h_total > 0:
+        alloc_pct_r = np.round(alloc_r / h_total * 100, 2)
+    else:
+        alloc_pct_r = np.zeros_like(alloc_r)
+    cap_conc_rounded = round(cap_conc, 2)
 
+    positions = []
+    for rank, (i, alloc, pct, c_oi, c_vol, c_impact, c_final, binding) in enumerate(zip(
+        taken.tolist(), alloc_r.tolist(), alloc_pct_r.tolist(), cap_oi_r.tolist(),
+        cap_vol_r.tolist(), cap_impact_r.tolist(), cap_final_r.tolist(), bindings,
+    ), start=1):
+        cand = candidates[i]
         positions.append(Position(
             coin=cand.coin,
             ticker=cand.ticker,
             hedge_symbol=cand.hedge_symbol,
-            rank=len(positions) + 1,
-            alloc_notional=round(alloc, 2),
-            alloc_pct=0,  # filled in below
-            cap_oi=round(cand.cap_oi, 2),
-            cap_vol=round(cand.cap_vol, 2),
-            cap_impact=round(cand.cap_impact, 2),
-            cap_conc=round(cap_conc, 2),
-            cap_final=round(cap_final, 2),
+            rank=rank,
+            alloc_notional=alloc,
+            alloc_pct=pct,
+            cap_oi=c_oi,
+            cap_vol=c_vol,
+            cap_impact=c_impact,
+            cap_conc=cap_conc_rounded,
+            cap_final=c_final,
             binding_cap=binding,
             forecast_apr=cand.forecast_apr,
             net_apr=cand.score,  # score = forecast - fee_drag - slip_drag
@@ -116,12 +185,6 @@ def build_portfolio(candidates: list, budget: float) -> Portfolio:
             ema_7d=cand.ema_7d,
             weekend_mult=cand.weekend_mult,
         ))
-        remaining -= alloc
-
-    # Compute totals
-    h_total = sum(p.alloc_notional for p in positions)
-    for p in positions:
-        p.alloc_pct = round((p.alloc_notional / h_total * 100) if h_total > 0 else 0, 2)
 
     perp_collateral = config.COLLATERAL_FRACTION * h_total
     coinbase_treasury = deployable - h_total - perp_collateral
@@ -143,7 +206,7 @@ def build_portfolio(candidates: list, budget: float) -> Portfolio:
     portfolio_usd_day = (portfolio_net_apr / 100) * budget / 365
 
     return Portfolio(
-        positions=positions,
+        positions=tuple(positions),
         budget=round(budget, 2),
         emergency=round(emergency, 2),
         deployable=round(deployable, 2),
@@ -158,25 +221,22 @@ def build_portfolio(candidates: list, budget: float) -> Portfolio:
     )
 
 
-def _binding_cap(alloc: float, cap_oi: float, cap_vol: float,
-                 cap_impact: float, cap_conc: float, remaining: float) -> str:
-    """Determine which cap was the binding constraint."""
-    caps = {
-        "oi": cap_oi,
-        "vol": cap_vol,
-        "impact": cap_impact,
-        "conc": cap_conc,
-        "budget": remaining,
-    }
-    # The binding cap is the smallest one (that equals the alloc)
-    binding = min(caps, key=caps.get)
-    return binding
+_CAP_NAMES = np.array(["oi", "vol", "impact", "conc", "budget"])
+
+
+def _binding_caps(cap_oi: np.ndarray, cap_vol: np.ndarray, cap_impact: np.ndarray,
+                  cap_conc: float, remaining: np.ndarray) -> list[str]:
+    """Name the binding (smallest) cap for each position; ties go to the earlier cap."""
+    caps = np.column_stack((
+        cap_oi, cap_vol, cap_impact, np.full_like(remaining, cap_conc), remaining,
+    ))
+    return _CAP_NAMES[np.argmin(caps, axis=1)].tolist()
 
 
 def _empty_portfolio(budget: float, emergency: float, deployable: float, h_max: float) -> Portfolio:
     """Return an empty portfolio when budget is too small."""
     return Portfolio(
-        positions=[],
+        positions=(),
         budget=round(budget, 2),
         emergency=round(emergency, 2),
         deployable=round(deployable, 2),
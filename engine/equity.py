@@ -2,9 +2,15 @@
 
 from __future__ import annotations
 
+import atexit
+import json
 import logging
+import os
+import re
+import tempfile
 import threading
 import time
+from collections.abc import Iterable
 
 import httpx
 
@@ -12,54 +18,139 @@ import config
 
 log = logging.getLogger(__name__)
 
-# Thread-safe cache for public symbols
-_symbols_lock = threading.Lock()
-_symbols_cache: set[str] = set()
-_symbols_last_fetched: float = 0
+# Public symbol cache as one immutable (symbols, fetched_at) tuple. Writers
+# publish a new tuple with a single assignment; readers snapshot it lock-free.
+_cache_state: tuple[frozenset[str], float] = (frozenset(), 0.0)
+# Single-flight refresh: the first caller fetches, concurrent callers wait on
+# its Event instead of issuing their own downloads.
+_refresh_lock = threading.Lock()
+_refresh_in_flight: threading.Event | None = None
+_REFRESH_WAIT = 15         # max seconds a follower waits for the leader
 _SYMBOLS_TTL = 86400       # refresh once per day on success
 _SYMBOLS_RETRY_TTL = 300   # retry after 5 min on failure
 
+# Dedicated client for NASDAQ downloads (both directory files share a connection)
+_NASDAQ_CLIENT = httpx.Client(timeout=10, follow_redirects=True)
+atexit.register(_NASDAQ_CLIENT.close)
 
-def _fetch_symbol_file(url: str) -> set[str]:
-    """Download a NASDAQ symbol directory file and return the set of tickers."""
+# First column of a data row, alphabetic only (skips symbols like "BRK.A")
+_SYMBOL_RE = re.compile(r"[ \t]*([A-Za-z]+)[ \t]*\|")
+
+
+def _parse_symbol_lines(lines: Iterable[str]) -> set[str]:
+    """Extract alphabetic tickers from the lines of a NASDAQ directory file."""
+    lines = iter(lines)
+    next(lines, None)  # skip the header row
     symbols = set()
+    match = _SYMBOL_RE.match
+    for line in lines:
+        if line.startswith("File Creation Time"):
+            break
+        m = match(line)
+        if m:
+            symbols.add(m.group(1).upper())
+    return symbols
+
+
+def _fetch_symbol_file(url: str) -> set[str]:
+    """Download a NASDAQ symbol directory file and return the set of tickers.
+
+    Streams the body so only one line is held in memory at a time.
+    """
     try:
-        resp = httpx.get(url, timeout=10, follow_redirects=True)
-        resp.raise_for_status()
-        lines = resp.text.strip().split("\n")
-        for line in lines[1:]:
-            if line.startswith("File Creation Time"):
-                break
-            parts = line.split("|")
-            if parts:
-                sym = parts[0].strip()
-                if sym and sym.isalpha():
-                    symbols.add(sym.upper())
+        with _NASDAQ_CLIENT.stream("GET", url) as resp:
+            resp.raise_for_status()
+            return _parse_symbol_lines(resp.iter_lines())
     except Exception as e:
         log.warning("Failed to fetch %s: %s", url, e)
-    return symbols
+        return set()
 
 
-def refresh_public_symbols() -> bool:
-    """Download NASDAQ + other-listed symbol directories and cache them.
+def _load_disk_cache() -> tuple[set[str], float] | None:
+    """Return (symbols, fetched_at) from the on-disk cache if it is still fresh."""
+    if not config.SYMBOLS_DISK_CACHE:
+        return None
+    try:
+        with open(config.SYMBOLS_CACHE_PATH, encoding="utf-8") as f:
+            data = json.load(f)
+        fetched_at = float(data["fetched_at"])
+        symbols = set(data["symbols"])
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+    if not symbols or time.time() - fetched_at > _SYMBOLS_TTL:
+        return None
+    return symbols, fetched_at
+
+
+def _save_disk_cache(symbols: frozenset[str], fetched_at: float) -> None:
+    """Atomically persist the symbol set so restarts can skip the download."""
+    if not config.SYMBOLS_DISK_CACHE:
+        return
+    directory = os.path.dirname(config.SYMBOLS_CACHE_PATH) or "."
+    try:
+        fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump({"fetched_at": fetched_at, "symbols": sorted(symbols)}, f)
+            os.replace(tmp, config.SYMBOLS_CACHE_PATH)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+    except OSError as e:
+        log.warning("Failed to write symbol cache %s: %s", config.SYMBOLS_CACHE_PATH, e)
+
+
+def _load_public_symbols() -> bool:
+    """Fetch (or load from disk) the symbol directories and publish them."""
+    global _cache_state
+    cached = _load_disk_cache()
+    if cached is not None:
+        symbols, fetched_at = cached
+        _cache_state = (frozenset(symbols), fetched_at)
+        log.info("Loaded %d public symbols from disk cache", len(symbols))
+        return True
 
-    Returns True if any symbols were loaded.
-    Always updates _symbols_last_fetched to prevent rapid retries on failure.
-    """
-    global _symbols_cache, _symbols_last_fetched
     nasdaq = _fetch_symbol_file(config.NASDAQ_LISTED_URL)
     other = _fetch_symbol_file(config.OTHER_LISTED_URL)
-    combined = nasdaq | other
-    with _symbols_lock:
-        # Always update timestamp to prevent retry storms
-        _symbols_last_fetched = time.time()
-        if combined:
-            _symbols_cache = combined
-            log.info("Loaded %d public symbols", len(_symbols_cache))
-            return True
-        else:
-            log.warning("NASDAQ symbol fetch returned 0 symbols — keeping old cache (retry in 5 min)")
-            return False
+    combined = frozenset(nasdaq | other)
+    # Always update timestamp to prevent retry storms
+    fetched_at = time.time()
+    if not combined:
+        _cache_state = (_cache_state[0], fetched_at)
+        log.warning("NASDAQ symbol fetch returned 0 symbols — keeping old cache (retry in 5 min)")
+        return False
+    _cache_state = (combined, fetched_at)
+    log.info("Loaded %d public symbols", len(combined))
+    _save_disk_cache(combined, fetched_at)
+    return True
+
+
+def refresh_public_symbols() -> bool:
+    """Load NASDAQ + other-listed symbol directories and cache them.
+
+    A fresh on-disk copy (written by any process within the TTL) is used
+    before falling back to the network. Concurrent callers share a single
+    in-flight refresh.
+    Returns True if any symbols are cached afterwards.
+    Always updates the fetch timestamp to prevent rapid retries on failure.
+    """
+    global _refresh_in_flight
+    with _refresh_lock:
+        event = _refresh_in_flight
+        leader = event is None
+        if leader:
+            event = _refresh_in_flight = threading.Event()
+
+    if not leader:
+        event.wait(timeout=_REFRESH_WAIT)
+        return bool(_cache_state[0])
+
+    try:
+        return _load_public_symbols()
+    finally:
+        with _refresh_lock:
+            _refresh_in_flight = None
+        event.set()
 
 
 def is_public_equity(ticker: str) -> bool:
@@ -68,24 +159,19 @@ def is_public_equity(ticker: str) -> bool:
     Fail-open: if directories can't be fetched and cache is empty,
     returns True (our HEDGE_MAP is curated, so assume valid).
     """
-    with _symbols_lock:
-        age = time.time() - _symbols_last_fetched if _symbols_last_fetched > 0 else float("inf")
-        has_cache = bool(_symbols_cache)
-        ttl = _SYMBOLS_TTL if has_cache else _SYMBOLS_RETRY_TTL
-
-        if _symbols_last_fetched > 0 and age <= ttl:
-            if has_cache:
-                return ticker.upper() in _symbols_cache
-            else:
-                # Recently failed, don't retry — fail open
-                return True
+    symbols, fetched_at = _cache_state
+    if fetched_at > 0:
+        ttl = _SYMBOLS_TTL if symbols else _SYMBOLS_RETRY_TTL
+        if time.time() - fetched_at <= ttl:
+            # Empty set here means a recent failure: don't retry, fail open
+            return ticker.upper() in symbols if symbols else True
 
     # Need to refresh (first call or TTL expired)
     refresh_public_symbols()
 
-    with _symbols_lock:
-        if _symbols_cache:
-            return ticker.upper() in _symbols_cache
+    symbols, _ = _cache_state
+    if symbols:
+        return ticker.upper() in symbols
 
     # Fail-open: can't verify, assume valid since HEDGE_MAP is curated
     return True
@@ -2,14 +2,35 @@
 
 from __future__ import annotations
 
+import asyncio
+import atexit
 import logging
+import math
+from collections.abc import Iterator
+from dataclasses import dataclass
+from datetime import datetime, timezone
 
 import httpx
+import numpy as np
 
 import config
 
+try:  # optional: orjson decodes the large /info payloads several times faster
+    from orjson import loads as _json_loads
+except ImportError:
+    from json import loads as _json_loads
+
 log = logging.getLogger(__name__)
 
+# One keep-alive client for every /info call (reuses TCP/TLS across requests)
+_HL_CLIENT = httpx.Client(
+    timeout=httpx.Timeout(15.0),
+    limits=httpx.Limits(max_connections=20, max_keepalive_connections=10),
+)
+atexit.register(_HL_CLIENT.close)
+
+L2_BULK_CONCURRENCY = 10   # max in-flight l2Book requests in fetch_l2_books_bulk
+
 
 def fetch_meta_and_asset_ctxs() -> tuple[list[dict], list[dict]]:
     """Fetch metaAndAssetCtxs for the xyz (TradFi) DEX.
@@ -18,13 +39,13 @@ def fetch_meta_and_asset_ctxs() -> tuple[list[dict], list[dict]]:
         universe_meta: list of dicts with name, szDecimals, maxLeverage, etc.
         asset_contexts: list of dicts with funding, openInterest, markPx, midPx, etc.
     """
-    resp = httpx.post(
+    resp = _HL_CLIENT.post(
         config.HL_INFO_URL,
         json={"type": "metaAndAssetCtxs", "dex": config.HL_TRADFI_DEX},
         timeout=15,
     )
     resp.raise_for_status()
-    data = resp.json()
+    data = _json_loads(resp.content)
     universe = data[0]["universe"]
     ctxs = data[1]
     return universe, ctxs
@@ -34,114 +55,233 @@ def fetch_funding_history(coin: str, start_time_ms: int = 0) -> list[dict]:
     """Fetch fundingHistory for a given coin (e.g. 'xyz:AAPL').
 
     Returns list of {coin, fundingRate, premium, time} sorted by time asc.
+    ``time`` is always an int epoch-ms (coerced here if the API ever sends
+    floats or ISO strings), so consumers can load it straight into int64.
     """
     payload = {
         "type": "fundingHistory",
         "coin": coin,
         "startTime": start_time_ms,
     }
-    resp = httpx.post(config.HL_INFO_URL, json=payload, timeout=15)
+    resp = _HL_CLIENT.post(config.HL_INFO_URL, json=payload, timeout=15)
     resp.raise_for_status()
-    return resp.json()
+    history = _json_loads(resp.content)
+    for entry in history:
+        t = entry.get("time")
+        if type(t) is not int:
+            entry["time"] = _epoch_ms(t)
+    return history
+
+
+def _epoch_ms(t) -> int | None:
+    """Coerce an epoch-ms number or ISO-8601 string to int epoch-ms."""
+    if isinstance(t, (int, float)):
+        return int(t)
+    if isinstance(t, str):
+        try:
+            dt = datetime.fromisoformat(t.replace("Z", "+00:00"))
+        except ValueError:
+            return None
+        if dt.tzinfo is None:
+            dt = dt.replace(tzinfo=timezone.utc)
+        return int(dt.timestamp() * 1000)
+    return None
 
 
 def fetch_l2_book(coin: str) -> dict:
-    """Fetch L2 orderbook for a coin.
+    """Fetch L2 orderbook for a coin as struct-of-arrays.
 
-    Returns {"bids": [{px, sz, n}], "asks": [{px, sz, n}]}.
+    Returns {"bids_px", "bids_sz", "asks_px", "asks_sz"}: float64 arrays,
+    best level first.
     """
-    resp = httpx.post(
+    resp = _HL_CLIENT.post(
         config.HL_INFO_URL,
         json={"type": "l2Book", "coin": coin},
         timeout=10,
     )
     resp.raise_for_status()
-    data = resp.json()
+    return _parse_l2_response(_json_loads(resp.content))
+
+
+def _parse_l2_response(data: dict) -> dict:
     levels = data.get("levels", [[], []])
-    bids = [{"px": float(l["px"]), "sz": float(l["sz"])} for l in levels[0]]
-    asks = [{"px": float(l["px"]), "sz": float(l["sz"])} for l in levels[1]]
-    return {"bids": bids, "asks": asks}
+    return _book_from_levels(levels[0], levels[1])
+
+
+async def _fetch_l2_book_async(
+    client: httpx.AsyncClient, sem: asyncio.Semaphore, coin: str,
+) -> dict:
+    async with sem:
+        resp = await client.post(
+            config.HL_INFO_URL,
+            json={"type": "l2Book", "coin": coin},
+        )
+    resp.raise_for_status()
+    return _parse_l2_response(_json_loads(resp.content))
+
+
+async def _fetch_l2_books(coins: list[str]) -> list[dict | BaseException]:
+    sem = asyncio.Semaphore(L2_BULK_CONCURRENCY)
+    async with httpx.AsyncClient(
+        timeout=10,
+        limits=httpx.Limits(max_connections=L2_BULK_CONCURRENCY),
+    ) as client:
+        return await asyncio.gather(
+            *(_fetch_l2_book_async(client, sem, c) for c in coins),
+            return_exceptions=True,
+        )
+
+
+def fetch_l2_books_bulk(coins: list[str]) -> dict[str, dict | Exception]:
+    """Fetch L2 books for many coins concurrently (at most L2_BULK_CONCURRENCY
+    requests in flight).
+
+    Returns {coin: book}, where a failed fetch maps to its exception so the
+    caller can fail that coin closed without losing the rest.
+    Must not be called from a thread that is already running an event loop.
+    """
+    if not coins:
+        return {}
+    results = asyncio.run(_fetch_l2_books(coins))
+    return dict(zip(coins, results))
+
+
+def _book_from_levels(bids: list[dict], asks: list[dict]) -> dict:
+    """Pack [{px, sz, ...}] levels into the SoA book layout."""
+    return {
+        "bids_px": np.fromiter((l["px"] for l in bids), dtype=np.float64, count=len(bids)),
+        "bids_sz": np.fromiter((l["sz"] for l in bids), dtype=np.float64, count=len(bids)),
+        "asks_px": np.fromiter((l["px"] for l in asks), dtype=np.float64, count=len(asks)),
+        "asks_sz": np.fromiter((l["sz"] for l in asks), dtype=np.float64, count=len(asks)),
+    }
+
+
+def book_arrays(book: dict) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Return (bids_px, bids_sz, asks_px, asks_sz) for a book.
+
+    Accepts the SoA layout from fetch_l2_book or the legacy
+    {"bids": [{px, sz}], "asks": [...]} list-of-dicts layout.
+    """
+    if "bids_px" not in book:
+        book = _book_from_levels(book.get("bids", []), book.get("asks", []))
+    return book["bids_px"], book["bids_sz"], book["asks_px"], book["asks_sz"]
+
+
+def book_has_both_sides(book: dict) -> bool:
+    """True if the book has at least one bid and one ask level."""
+    bids_px, _, asks_px, _ = book_arrays(book)
+    return bids_px.size > 0 and asks_px.size > 0
 
 
 def compute_impact(book: dict, notional: float, side: str = "sell") -> float:
     """Compute execution slippage for a given notional order.
 
-    Walks the bid side (for sell/short) or ask side (for buy/cover).
+    Fills against the bid side (for sell/short) or ask side (for buy/cover).
     Returns slippage as a fraction (e.g. 0.002 = 0.2%).
     Returns 1.0 (100%) if book is empty or insufficient depth.
     """
-    bids = book.get("bids", [])
-    asks = book.get("asks", [])
-
-    if not bids or not asks:
+    bids_px, bids_sz, asks_px, asks_sz = book_arrays(book)
+    if bids_px.size == 0 or asks_px.size == 0:
         return 1.0
-
-    mid = (bids[0]["px"] + asks[0]["px"]) / 2
+    mid = (bids_px[0] + asks_px[0]) / 2
     if mid <= 0:
         return 1.0
-
-    # Walk the appropriate side
-    levels = bids if side == "sell" else asks
-    remaining = notional
-    total_cost = 0.0
-    total_filled = 0.0
-
-    for level in levels:
-        px = level["px"]
-        sz = level["sz"]
-        level_notional = px * sz
-
-        if remaining <= level_notional:
-            # Partial fill at this level
-            fill_sz = remaining / px if px > 0 else 0
-            total_cost += remaining
-            total_filled += fill_sz
-            remaining = 0
-            break
-        else:
-            total_cost += level_notional
-            total_filled += sz
-            remaining -= level_notional
-
-    if total_filled <= 0 or remaining > 0:
-        return 1.0  # couldn't fill
-
-    vwap = total_cost / total_filled
-    slippage = abs(vwap - mid) / mid
-    return slippage
+    if side == "sell":
+        return _impact_kernel(bids_px, bids_sz, notional, mid)
+    return _impact_kernel(asks_px, asks_sz, notional, mid)
 
 
 def find_max_notional_for_impact(book: dict, max_impact_pct: float) -> float:
-    """Binary search for the largest notional with slippage <= max_impact_pct.
+    """Largest sell notional whose slippage vs. mid stays <= max_impact_pct.
 
     Returns the max notional in USD. Returns 0 if book is empty.
     """
-    bids = book.get("bids", [])
-    if not bids:
+    bids_px, bids_sz, asks_px, _ = book_arrays(book)
+    if bids_px.size == 0 or asks_px.size == 0:
         return 0.0
-
-    # Total book depth on bid side
-    total_depth = sum(l["px"] * l["sz"] for l in bids)
-    if total_depth <= 0:
+    mid = (bids_px[0] + asks_px[0]) / 2
+    if mid <= 0:
         return 0.0
+    return _floor_cents(_max_notional_kernel(bids_px, bids_sz, mid, max_impact_pct))
+
+
+# ── Book-walk kernels: float64 arrays in, float out (no dict access) ─────────
+
+def _impact_kernel(px: np.ndarray, sz: np.ndarray, notional: float, mid: float) -> float:
+    """|vwap - mid| / mid for filling ``notional`` down one side of the book.
+
+    Locates the last touched level with a searchsorted on cumulative notional.
+    Returns 1.0 when the order is non-positive or exceeds the side's depth.
+    """
+    # Common case: the whole order fills at the touch (impact = half-spread)
+    top_px = float(px[0])
+    if top_px > 0 and 0 < notional <= top_px * float(sz[0]):
+        return abs(top_px - mid) / mid
+
+    cum_notional = np.cumsum(px * sz)
+    if notional <= 0 or notional > cum_notional[-1]:
+        return 1.0  # nothing to fill / couldn't fill
+
+    # First level whose cumulative notional covers the order; partial fill there
+    k = int(np.searchsorted(cum_notional, notional, side="left"))
+    prev_notional = cum_notional[k - 1] if k > 0 else 0.0
+    filled = sz[:k].sum()
+    if px[k] > 0:
+        filled += (notional - prev_notional) / px[k]
+    if filled <= 0:
+        return 1.0
+
+    vwap = notional / filled
+    return float(abs(vwap - mid) / mid)
+
 
-    lo, hi = 0.0, total_depth
-    best = 0.0
+def _max_notional_kernel(
+    bids_px: np.ndarray, bids_sz: np.ndarray, mid: float, max_impact_pct: float,
+) -> float:
+    """Closed-form max sell notional over the bid ladder (unrounded).
 
-    for _ in range(50):  # binary search iterations
-        mid_val = (lo + hi) / 2
-        if mid_val < 1:
-            break
-        impact = compute_impact(book, mid_val, side="sell")
-        if impact <= max_impact_pct:
-            best = mid_val
-            lo = mid_val
-        else:
-            hi = mid_val
-        if hi - lo < 100:  # $100 precision
-            break
+    Slippage <= m  <=>  vwap >= T with T = mid * (1 - m).
+    Levels priced at or above T can only keep vwap >= T, so they fill whole.
+    On a level with px < T, filling x more notional on top of cumulative
+    notional C and size S keeps (C + x) / (S + x / px) >= T while
+    x <= px * (C - T * S) / (T - px); the first level where that bound is
+    below the level's own notional holds the answer.
+    """
+    # Crossed book: even the first dollar fills beyond the allowed impact
+    if bids_px[0] > mid * (1 + max_impact_pct):
+        return 0.0
 
-    return round(best, 2)
+    threshold = mid * (1 - max_impact_pct)
+    level_notional = bids_px * bids_sz
+    cum_notional = np.cumsum(level_notional)
+    prev_notional = cum_notional - level_notional
+    prev_size = np.cumsum(bids_sz) - bids_sz
+    with np.errstate(divide="ignore", invalid="ignore"):
+        x_max = np.where(
+            bids_px < threshold,
+            bids_px * (prev_notional - threshold * prev_size) / (threshold - bids_px),
+            np.inf,
+        )
+    stop = np.flatnonzero(x_max < level_notional)
+    if stop.size:
+        k = stop[0]
+        return prev_notional[k] + max(x_max[k], 0.0)
+    return cum_notional[-1]
+
+
+def _floor_cents(usd: float) -> float:
+    """Round down to whole cents so the result never exceeds fillable depth."""
+    return math.floor(float(usd) * 100) / 100
+
+
+def _funding_or_nan(raw) -> float:
+    """Raw funding value as a float; NaN when missing or non-numeric (incl. "NaN")."""
+    if raw is None or raw == "":
+        return math.nan
+    try:
+        return float(raw)
+    except (ValueError, TypeError):
+        return math.nan
 
 
 def _parse_funding(raw) -> tuple[float | None, bool]:
@@ -151,17 +291,63 @@ def _parse_funding(raw) -> tuple[float | None, bool]:
     - Missing/non-numeric → (None, True)
     - Valid numeric       → (float_value, False)
     """
-    if raw is None or raw == "":
-        return None, True
-    try:
-        val = float(raw)
-    except (ValueError, TypeError):
+    val = _funding_or_nan(raw)
+    if math.isnan(val):
         return None, True
     return val, False
 
 
-def parse_market_data(universe: list[dict], ctxs: list[dict]) -> list[dict]:
-    """Combine universe metadata + asset contexts into unified market dicts.
+@dataclass
+class MarketData:
+    """Columnar market snapshot: one list/array per field, one entry per market.
+
+    funding_hourly/funding_apr are NaN where ``funding_missing`` is True.
+    Iterating (or ``rows()``) yields the legacy per-market dicts.
+    """
+    coin: list[str]
+    ticker: list[str]
+    mark_px: np.ndarray
+    mid_px: np.ndarray
+    funding_hourly: np.ndarray
+    funding_apr: np.ndarray
+    funding_missing: np.ndarray
+    oi_base: np.ndarray
+    oi_usd: np.ndarray
+    volume_24h: np.ndarray
+    max_leverage: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.coin)
+
+    def __iter__(self) -> Iterator[dict]:
+        return self.rows()
+
+    def __getitem__(self, i: int) -> dict:
+        return self._row(i)
+
+    def _row(self, i: int) -> dict:
+        missing = bool(self.funding_missing[i])
+        return {
+            "coin": self.coin[i],               # full coin name for API calls: "xyz:TSLA"
+            "ticker": self.ticker[i],           # display name: "TSLA"
+            "mark_px": float(self.mark_px[i]),
+            "mid_px": float(self.mid_px[i]),
+            "funding_hourly": None if missing else float(self.funding_hourly[i]),
+            "funding_apr": None if missing else float(self.funding_apr[i]),  # decimal or None
+            "funding_missing": missing,
+            "oi_base": float(self.oi_base[i]),
+            "oi_usd": float(self.oi_usd[i]),
+            "volume_24h": float(self.volume_24h[i]),
+            "max_leverage": int(self.max_leverage[i]),
+        }
+
+    def rows(self) -> Iterator[dict]:
+        """Yield one dict per market, for callers that still want records."""
+        return (self._row(i) for i in range(len(self.coin)))
+
+
+def parse_market_data(universe: list[dict], ctxs: list[dict]) -> MarketData:
+    """Combine universe metadata + asset contexts into columnar market data.
 
     Funding is HOURLY. APR = funding_hourly * 24 * 365.
     OI is in base units; OI_USD = openInterest * markPx.
@@ -170,44 +356,53 @@ def parse_market_data(universe: list[dict], ctxs: list[dict]) -> list[dict]:
     Distinguishes missing funding (None in API) from true 0.00% funding.
     Sets ``funding_missing=True`` when the funding field is absent or non-numeric.
     """
-    markets = []
+    n = min(len(universe), len(ctxs))
+    coins: list[str] = []
+    tickers: list[str] = []
+    mark_px = np.empty(n, dtype=np.float64)
+    mid_px = np.empty(n, dtype=np.float64)
+    funding_raw: list = []
+    oi_base = np.empty(n, dtype=np.float64)
+    volume_24h = np.empty(n, dtype=np.float64)
+    max_leverage = np.empty(n, dtype=np.int64)
+
+    k = 0
     for meta, ctx in zip(universe, ctxs):
         try:
             name = meta["name"]  # e.g. "xyz:TSLA"
-            mark_px = float(ctx.get("markPx") or 0)
-            mid_px = float(ctx.get("midPx") or 0)
-
-            funding_hourly, funding_missing = _parse_funding(ctx.get("funding"))
-
-            oi_base = float(ctx.get("openInterest") or 0)
-            volume_24h = float(ctx.get("dayNtlVlm") or 0)
-            max_leverage = int(meta.get("maxLeverage") or 1)
-
-            # Funding is hourly — annualize correctly
-            if funding_missing:
-                funding_apr = None
-            else:
-                funding_apr = funding_hourly * 24 * 365
-
-            # OI in base units → multiply by mark price for USD
-            oi_usd = oi_base * mark_px
-
-            # Extract clean ticker (strip "xyz:" prefix for display)
-            display_ticker = name.split(":")[-1] if ":" in name else name
-
-            markets.append({
-                "coin": name,               # full coin name for API calls: "xyz:TSLA"
-                "ticker": display_ticker,    # display name: "TSLA"
-                "mark_px": mark_px,
-                "mid_px": mid_px,
-                "funding_hourly": funding_hourly,
-                "funding_apr": funding_apr,  # as decimal (e.g. 0.20 = 20%) or None
-                "funding_missing": funding_missing,
-                "oi_base": oi_base,
-                "oi_usd": oi_usd,
-                "volume_24h": volume_24h,
-                "max_leverage": max_leverage,
-            })
+            row = (
+                float(ctx.get("markPx") or 0),
+                float(ctx.get("midPx") or 0),
+                float(ctx.get("openInterest") or 0),
+                float(ctx.get("dayNtlVlm") or 0),
+                int(meta.get("maxLeverage") or 1),
+            )
         except (ValueError, KeyError):
             continue
-    return markets
+        mark_px[k], mid_px[k], oi_base[k], volume_24h[k], max_leverage[k] = row
+        funding_raw.append(ctx.get("funding"))
+        coins.append(name)
+        # Extract clean ticker (strip "xyz:" prefix for display)
+        tickers.append(name.split(":")[-1] if ":" in name else name)
+        k += 1
+
+    mark_px = mark_px[:k]
+    oi_base = oi_base[:k]
+    # One conversion pass; missing is exactly where the value didn't parse
+    funding_hourly = np.fromiter(map(_funding_or_nan, funding_raw), dtype=np.float64, count=k)
+    funding_missing = np.isnan(funding_hourly)
+    return MarketData(
+        coin=coins,
+        ticker=tickers,
+        mark_px=mark_px,
+        mid_px=mid_px[:k],
+        funding_hourly=funding_hourly,
+        # Funding is hourly — annualize correctly (NaN stays NaN for missing)
+        funding_apr=funding_hourly * 24 * 365,
+        funding_missing=funding_missing,
+        oi_base=oi_base,
+        # OI in base units → multiply by mark price for USD
+        oi_usd=oi_base * mark_px,
+        volume_24h=volume_24h[:k],
+        max_leverage=max_leverage[:k],
+    )
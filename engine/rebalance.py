@@ -8,6 +8,7 @@ the expected gain and estimated cost in USD.
 from __future__ import annotations
 
 from dataclasses import dataclass
+from typing import NamedTuple
 
 import config
 
@@ -23,6 +24,53 @@ class RebalanceDecision:
     changes: list[dict]           # per-position changes
 
 
+class _PositionDiff(NamedTuple):
+    """One coin whose allocation moves by at least the minimum trade size."""
+    coin: str
+    ticker: str
+    old_alloc: float
+    new_alloc: float
+    delta: float
+    fee_cost: float
+    friction: float
+
+
+_MIN_CHANGE_USD = 100  # ignore tiny changes
+
+
+def _build_diff(old_positions: list[dict], new_positions: list[dict]) -> list[_PositionDiff]:
+    """Per-coin allocation changes between two portfolios, sorted by coin.
+
+    Cost per position change = 2 * taker_fee * delta_notional + friction.
+    Both opening new and closing old positions incur fees.
+    """
+    old_alloc = {p["coin"]: p.get("alloc_notional", 0) for p in old_positions}
+    new_alloc = {p["coin"]: p.get("alloc_notional", 0) for p in new_positions}
+    tickers = {p["coin"]: p.get("ticker", p["coin"]) for p in old_positions}
+    tickers.update((p["coin"], p.get("ticker", p["coin"])) for p in new_positions)
+
+    fee_rate = 2 * config.TAKER_FEE_PCT  # taker on both perp and equity legs
+    friction_rate = config.REBALANCE_FRICTION_BPS / 10000
+    diffs = []
+    for coin in tickers:  # insertion-ordered union of old and new coins
+        o = old_alloc.get(coin, 0)
+        n = new_alloc.get(coin, 0)
+        delta = n - o
+        size = abs(delta)
+        if size < _MIN_CHANGE_USD:
+            continue
+        diffs.append(_PositionDiff(
+            coin, tickers[coin], o, n, delta, fee_rate * size, friction_rate * size,
+        ))
+    # Sort only the surviving changes, not the whole union
+    diffs.sort()
+    return diffs
+
+
+def _diff_cost(diffs: list[_PositionDiff]) -> float:
+    return sum(d.fee_cost + d.friction for d in diffs)
+
+
 def compute_switching_cost(
     old_positions: list[dict],
     new_positions: list[dict],
@@ -32,24 +80,7 @@ def compute_switching_cost(
     Cost per position change = 2 * taker_fee * delta_notional + friction.
     Both opening new and closing old positions incur fees.
     """
-    old_map = {p["coin"]: p for p in old_positions}
-    new_map = {p["coin"]: p for p in new_positions}
-    all_coins = set(old_map.keys()) | set(new_map.keys())
-
-    total_cost = 0.0
-    for coin in all_coins:
-        old_alloc = old_map.get(coin, {}).get("alloc_notional", 0)
-        new_alloc = new_map.get(coin, {}).get("alloc_notional", 0)
-        delta = abs(new_alloc - old_alloc)
-        if delta < 100:  # ignore tiny changes
-            continue
-        # Fee: taker on both perp and equity legs
-        fee_cost = 2 * config.TAKER_FEE_PCT * delta
-        # Friction buffer
-        friction = config.REBALANCE_FRICTION_BPS / 10000 * delta
-        total_cost += fee_cost + friction
-
-    return total_cost
+    return _diff_cost(_build_diff(old_positions, new_positions))
 
 
 def compute_expected_gain(
@@ -63,14 +94,17 @@ def compute_expected_gain(
     Yield is the weighted net APR.
     """
     def portfolio_yield(positions: list[dict]) -> float:
-        total_alloc = sum(p.get("alloc_notional", 0) for p in positions)
-        if total_alloc == 0 or budget == 0:
+        if budget == 0:
             return 0.0
-        weighted = sum(
-            (p.get("net_apr", 0) or p.get("score", 0)) / 100 * p.get("alloc_notional", 0) / budget
-            for p in positions
-        )
-        return weighted * 100  # back to APR %
+        total_alloc = 0.0
+        weighted = 0.0
+        for p in positions:
+            alloc = p.get("alloc_notional", 0)
+            total_alloc += alloc
+            weighted += (p.get("net_apr", 0) or p.get("score", 0)) * alloc
+        if total_alloc == 0:
+            return 0.0
+        return weighted / budget  # APR % (the /100 and *100 cancel)
 
     old_yield = portfolio_yield(old_positions)
     new_yield = portfolio_yield(new_positions)
@@ -86,29 +120,24 @@ def evaluate_rebalance(
     budget: float,
 ) -> RebalanceDecision:
     """Evaluate whether switching from old to new portfolio is worthwhile."""
-    cost = compute_switching_cost(old_positions, new_positions)
+    if not old_positions:
+        return _initial_decision(new_positions, budget)
+
+    diffs = _build_diff(old_positions, new_positions)
+    cost = _diff_cost(diffs)
     gain = compute_expected_gain(old_positions, new_positions, budget)
     threshold = cost * config.REBALANCE_COST_MULTIPLIER
 
-    # Build per-position change list
-    old_map = {p["coin"]: p for p in old_positions}
-    new_map = {p["coin"]: p for p in new_positions}
-    all_coins = sorted(set(old_map.keys()) | set(new_map.keys()))
-    changes = []
-    for coin in all_coins:
-        old_alloc = old_map.get(coin, {}).get("alloc_notional", 0)
-        new_alloc = new_map.get(coin, {}).get("alloc_notional", 0)
-        delta = new_alloc - old_alloc
-        if abs(delta) < 100:
-            continue
-        ticker = new_map.get(coin, old_map.get(coin, {})).get("ticker", coin)
-        changes.append({
-            "ticker": ticker,
-            "old_alloc": old_alloc,
-            "new_alloc": new_alloc,
-            "delta": delta,
-            "action": "ADD" if old_alloc == 0 else "REMOVE" if new_alloc == 0 else ("INCREASE" if delta > 0 else "DECREASE"),
-        })
+    changes = [
+        {
+            "ticker": d.ticker,
+            "old_alloc": d.old_alloc,
+            "new_alloc": d.new_alloc,
+            "delta": d.delta,
+            "action": "ADD" if d.old_alloc == 0 else "REMOVE" if d.new_alloc == 0 else ("INCREASE" if d.delta > 0 else "DECREASE"),
+        }
+        for d in diffs
+    ]
 
     if gain > config.REBALANCE_MIN_GAIN_USD and gain >= threshold:
         recommendation = "SWITCH"
@@ -133,3 +162,37 @@ def evaluate_rebalance(
         rationale=rationale,
         changes=changes,
     )
+
+
+def _initial_decision(new_positions: list[dict], budget: float) -> RebalanceDecision:
+    """Cold start: there is nothing to switch away from, so no switching cost."""
+    if not new_positions:
+        return RebalanceDecision(
+            recommendation="HOLD",
+            expected_gain_usd=0.0,
+            estimated_cost_usd=0.0,
+            threshold_usd=0.0,
+            rationale="No current or target positions.",
+            changes=[],
+        )
+
+    gain = compute_expected_gain([], new_positions, budget)
+    changes = [
+        {
+            "ticker": p.get("ticker", p["coin"]),
+            "old_alloc": 0,
+            "new_alloc": p.get("alloc_notional", 0),
+            "delta": p.get("alloc_notional", 0),
+            "action": "ADD",
+        }
+        for p in sorted(new_positions, key=lambda p: p["coin"])
+        if abs(p.get("alloc_notional", 0)) >= _MIN_CHANGE_USD
+    ]
+    return RebalanceDecision(
+        recommendation="SWITCH",
+        expected_gain_usd=round(gain, 2),
+        estimated_cost_usd=0.0,
+        threshold_usd=0.0,
+        rationale="Initial portfolio construction — no current positions to switch from.",
+        changes=changes,
+    )
@@ -6,10 +6,18 @@ are hourly; we aggregate to 8h epochs for EMA computation.
 
 from __future__ import annotations
 
+import itertools
 import logging
-import statistics
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
-from datetime import datetime, timezone
+from functools import lru_cache
+from datetime import datetime
+from operator import attrgetter
+from typing import NamedTuple
+from zoneinfo import ZoneInfo
+
+import numpy as np
 
 import config
 import db
@@ -21,8 +29,10 @@ log = logging.getLogger(__name__)
 MAX_DEEP_SCAN = config.MAX_DEEP_SCAN
 MAX_DEEP_SCAN_HARD = config.MAX_DEEP_SCAN_HARD
 
+FETCH_WORKERS = 16  # concurrent fundingHistory requests during the deep scan
 
-@dataclass
+
+@dataclass(slots=True)
 class Candidate:
     """A market that passed hard gates and has computed scores/caps."""
     coin: str
@@ -44,7 +54,31 @@ class Candidate:
     mark_px: float
 
 
-@dataclass
+# Candidate fields rounded to cents / basis points once per scan
+_CENTS_FIELDS = (
+    "ema_3d", "ema_7d", "forecast_apr", "score", "fee_drag_apr",
+    "slippage_drag_apr", "cap_oi", "cap_vol", "cap_impact",
+)
+
+
+def _round_candidates(candidates: list[Candidate]) -> None:
+    """Round presentational fields of all candidates in one array pass.
+
+    np.round rounds the scaled binary value (x * 100) half to even, not the
+    exact decimal like builtin round(), so half-cent inputs can land 0.01
+    apart from round() (2.675 -> 2.68, not 2.67).
+    """
+    if not candidates:
+        return
+    cents = np.round(np.array([[getattr(c, f) for f in _CENTS_FIELDS] for c in candidates]), 2)
+    mults = np.round(np.fromiter((c.weekend_mult for c in candidates), dtype=np.float64), 4)
+    for c, row, mult in zip(candidates, cents.tolist(), mults.tolist()):
+        for f, v in zip(_CENTS_FIELDS, row):
+            setattr(c, f, v)
+        c.weekend_mult = mult
+
+
+@dataclass(slots=True, frozen=True)
 class ScanResult:
     candidates: list[Candidate]
     rejected: list[dict]
@@ -56,141 +90,274 @@ class ScanResult:
 
 # ── NYSE Trading Hours ──────────────────────────────────────────────────────
 
+_ET_TZ = ZoneInfo("America/New_York")
+_NYSE_OPEN_MIN = config.NYSE_OPEN_HOUR * 60 + config.NYSE_OPEN_MINUTE
+_NYSE_CLOSE_MIN = config.NYSE_CLOSE_HOUR * 60 + config.NYSE_CLOSE_MINUTE
+
+
 def is_nyse_trading_hours() -> bool:
     """Check if current time is within NYSE core hours (9:30-16:00 ET)."""
-    from zoneinfo import ZoneInfo
-    now_et = datetime.now(ZoneInfo("America/New_York"))
+    now_et = datetime.now(_ET_TZ)
     if now_et.weekday() >= 5:
         return False
     t = now_et.hour * 60 + now_et.minute
-    open_t = config.NYSE_OPEN_HOUR * 60 + config.NYSE_OPEN_MINUTE
-    close_t = config.NYSE_CLOSE_HOUR * 60 + config.NYSE_CLOSE_MINUTE
-    return open_t <= t < close_t
+    return _NYSE_OPEN_MIN <= t < _NYSE_CLOSE_MIN
 
 
 def is_weekend_et() -> bool:
     """Check if current time is weekend in ET."""
-    from zoneinfo import ZoneInfo
-    now_et = datetime.now(ZoneInfo("America/New_York"))
+    now_et = datetime.now(_ET_TZ)
     return now_et.weekday() >= 5
 
 
 # ── 8h Epoch Aggregation ────────────────────────────────────────────────────
 
-def aggregate_to_8h_epochs(hourly_history: list[dict]) -> list[dict]:
+@dataclass
+class EpochBlock:
+    """8h funding epochs as parallel arrays, oldest first."""
+    epoch_ts: np.ndarray      # ISO-8601 UTC strings
+    rate_8h: np.ndarray       # float64, mean hourly rate in the epoch
+    apr: np.ndarray           # float64, APR percentage
+    is_weekend: np.ndarray    # bool, epoch starts on an ET weekend
+
+    def __len__(self) -> int:
+        return len(self.apr)
+
+    def __getitem__(self, idx: slice) -> EpochBlock:
+        return EpochBlock(self.epoch_ts[idx], self.rate_8h[idx], self.apr[idx], self.is_weekend[idx])
+
+    @classmethod
+    def empty(cls) -> EpochBlock:
+        f = np.empty(0, dtype=np.float64)
+        return cls(np.empty(0, dtype=str), f, f, np.empty(0, dtype=bool))
+
+    @classmethod
+    def from_records(cls, records: list[dict]) -> EpochBlock:
+        """Build a block from epoch dicts (any of the four keys may be absent)."""
+        n = len(records)
+        return cls(
+            epoch_ts=np.array([r.get("epoch_ts", "") for r in records], dtype=str),
+            rate_8h=np.fromiter((r.get("rate_8h", 0.0) for r in records), dtype=np.float64, count=n),
+            apr=np.fromiter((r["apr"] for r in records), dtype=np.float64, count=n),
+            is_weekend=np.fromiter((bool(r.get("is_weekend")) for r in records), dtype=bool, count=n),
+        )
+
+    def db_rows(self, coin: str) -> Iterator[tuple[str, str, float, float, bool]]:
+        """(coin, epoch_ts, rate_8h, apr, is_weekend) rows for upsert_funding_epoch_8h_many."""
+        return zip(
+            itertools.repeat(coin), self.epoch_ts.tolist(), self.rate_8h.tolist(),
+            self.apr.tolist(), self.is_weekend.tolist(),
+        )
+
+    def to_records(self) -> list[dict]:
+        """Epoch dicts in the legacy list-of-dicts layout."""
+        return [
+            {"epoch_ts": ts, "rate_8h": r, "apr": a, "is_weekend": w}
+            for ts, r, a, w in zip(
+                self.epoch_ts.tolist(), self.rate_8h.tolist(),
+                self.apr.tolist(), self.is_weekend.tolist(),
+            )
+        ]
+
+
+def _apr_column(epochs_8h: EpochBlock | list[dict]) -> np.ndarray:
+    """APR values (oldest first) without materializing the other columns."""
+    if isinstance(epochs_8h, EpochBlock):
+        return epochs_8h.apr
+    return np.fromiter((e["apr"] for e in epochs_8h), dtype=np.float64, count=len(epochs_8h))
+
+
+def _weekend_column(epochs_8h: EpochBlock | list[dict]) -> np.ndarray:
+    if isinstance(epochs_8h, EpochBlock):
+        return epochs_8h.is_weekend
+    return np.fromiter((bool(e.get("is_weekend")) for e in epochs_8h), dtype=bool, count=len(epochs_8h))
+
+
+def _merge_epochs(stored: EpochBlock | None, delta: EpochBlock) -> EpochBlock:
+    """Stored epochs followed by freshly aggregated ones; fresh epochs win on overlap."""
+    if stored is None or len(stored) == 0:
+        return delta
+    if len(delta) == 0:
+        return stored
+    keep = stored.epoch_ts < delta.epoch_ts[0]
+    return EpochBlock(
+        np.concatenate((stored.epoch_ts[keep], delta.epoch_ts)),
+        np.concatenate((stored.rate_8h[keep], delta.rate_8h)),
+        np.concatenate((stored.apr[keep], delta.apr)),
+        np.concatenate((stored.is_weekend[keep], delta.is_weekend)),
+    )
+
+
+def _resume_time_ms(stored: EpochBlock | None) -> int:
+    """fundingHistory startTime that re-covers the latest stored (maybe partial) epoch."""
+    if stored is None or len(stored) == 0:
+        return 0
+    return int(datetime.fromisoformat(str(stored.epoch_ts[-1])).timestamp() * 1000)
+
+
+_EPOCH_MS = 8 * 3600 * 1000
+_DAY_MS = 24 * 3600 * 1000
+# Epochs start at 0/8/16 UTC. ET is UTC-5 (EST) or UTC-4 (EDT); from those
+# starts both offsets land on the same ET calendar day, so a fixed -5h shift
+# gives the exact ET weekday without per-epoch tz conversion.
+_ET_SHIFT_MS = -5 * 3600 * 1000
+
+
+def _et_weekend_mask(epoch_start_ms: np.ndarray) -> np.ndarray:
+    """True where an 8h epoch (starting at 0/8/16 UTC) falls on an ET Sat/Sun."""
+    # 1970-01-01 was a Thursday: weekday (Mon=0) = (days + 3) % 7
+    et_days = (epoch_start_ms + _ET_SHIFT_MS) // _DAY_MS
+    return (et_days + 3) % 7 >= 5
+
+
+def _history_arrays(hourly_history: list[dict]) -> tuple[np.ndarray, np.ndarray]:
+    """(time_ms, rate) arrays for the entries that carry a usable timestamp."""
+    n = len(hourly_history)
+    rates = np.fromiter(
+        (float(e.get("fundingRate") or e.get("funding_rate") or 0) for e in hourly_history),
+        dtype=np.float64, count=n,
+    )
+    try:
+        # Fast path: int epoch-ms "time" on every entry, as fetch_funding_history returns
+        times = np.fromiter((e["time"] for e in hourly_history), dtype=np.int64, count=n)
+    except (KeyError, TypeError, ValueError):
+        parsed = [hyperliquid._epoch_ms(e.get("time") or e.get("timestamp")) for e in hourly_history]
+        keep = np.fromiter((t is not None for t in parsed), dtype=bool, count=n)
+        return np.array([t for t in parsed if t is not None], dtype=np.int64), rates[keep]
+    keep = times != 0  # a falsy timestamp counts as missing
+    return times[keep], rates[keep]
+
+
+def aggregate_to_8h_epochs(hourly_history: list[dict]) -> EpochBlock:
     """Group hourly funding entries into 8h buckets.
 
     Each entry has 'time' (ms timestamp or ISO string) and 'fundingRate' (hourly rate).
     Buckets are 0:00, 8:00, 16:00 UTC. The 8h rate = mean of hourly rates in that bucket.
     Tags each epoch with is_weekend based on ET timezone.
+    Bucketing, means and weekend tags are computed as array ops.
     """
-    from zoneinfo import ZoneInfo
-
-    et_tz = ZoneInfo("America/New_York")
-    buckets: dict[str, list[float]] = {}
-
-    for entry in hourly_history:
-        rate = float(entry.get("fundingRate") or entry.get("funding_rate") or 0)
-        ts = entry.get("time") or entry.get("timestamp")
-
-        if isinstance(ts, (int, float)):
-            dt = datetime.fromtimestamp(ts / 1000, tz=timezone.utc)
-        elif isinstance(ts, str):
-            try:
-                dt = datetime.fromisoformat(ts.replace("Z", "+00:00"))
-                if dt.tzinfo is None:
-                    dt = dt.replace(tzinfo=timezone.utc)
-            except ValueError:
-                continue
-        else:
-            continue
+    times, rates = _history_arrays(hourly_history)
+    if times.size == 0:
+        return EpochBlock.empty()
+
+    epoch_ts, inverse, counts, is_weekend = _bucket_layout(_TimesKey(times))
+    mean_rate = np.bincount(inverse, weights=rates) / counts
+    # APR = mean_hourly_rate * 24 * 365 * 100 (as percentage)
+    apr = mean_rate * 24 * 365 * 100
+
+    return EpochBlock(
+        epoch_ts=epoch_ts,
+        rate_8h=mean_rate,
+        apr=apr,
+        is_weekend=is_weekend,
+    )
 
-        # Round down to 8h epoch
-        epoch_hour = (dt.hour // 8) * 8
-        epoch_dt = dt.replace(hour=epoch_hour, minute=0, second=0, microsecond=0)
-        epoch_key = epoch_dt.isoformat()
-
-        if epoch_key not in buckets:
-            buckets[epoch_key] = []
-        buckets[epoch_key].append(rate)
-
-    # Convert to list of dicts
-    epochs = []
-    for epoch_ts, rates in sorted(buckets.items()):
-        dt = datetime.fromisoformat(epoch_ts)
-        dt_et = dt.astimezone(et_tz)
-        is_weekend = dt_et.weekday() >= 5
-
-        mean_rate = sum(rates) / len(rates)
-        # APR = mean_hourly_rate * 24 * 365 * 100 (as percentage)
-        apr = mean_rate * 24 * 365 * 100
-
-        epochs.append({
-            "epoch_ts": epoch_ts,
-            "rate_8h": mean_rate,
-            "apr": apr,
-            "is_weekend": is_weekend,
-        })
 
-    return epochs
+class _TimesKey:
+    """Hashable wrapper for a timestamp array, used as the layout cache key.
+
+    Hashes a cheap summary (length, first, last, sum) instead of the raw bytes;
+    equality still compares the full arrays, so a summary collision or a gap
+    can never return another window's layout.
+    """
 
+    __slots__ = ("times", "_hash")
 
-# ── Dual EMA Computation ────────────────────────────────────────────────────
+    def __init__(self, times: np.ndarray):
+        self.times = times
+        self._hash = hash((times.size, int(times[0]), int(times[-1]), int(times.sum())))
 
-def _ema(values: list[float], alpha: float) -> float:
-    """Compute EMA over a list of values (oldest first)."""
-    if not values:
-        return 0.0
-    ema = values[0]
-    for v in values[1:]:
-        ema = alpha * v + (1 - alpha) * ema
-    return ema
+    def __hash__(self) -> int:
+        return self._hash
 
+    def __eq__(self, other) -> bool:
+        return isinstance(other, _TimesKey) and np.array_equal(self.times, other.times)
 
-def compute_dual_ema(epochs_8h: list[dict]) -> tuple[float | None, float | None]:
+
+@lru_cache(maxsize=256)
+def _bucket_layout(key: _TimesKey) -> tuple[np.ndarray, ...]:
+    """(epoch_ts labels, bucket index per entry, entries per bucket, weekend mask).
+
+    Depends only on the timestamps, which every cohort coin shares for the same
+    fetch window, so only the first coin of a scan pays for it. Arrays are
+    read-only because they are shared between EpochBlocks.
+    """
+    epoch_ms = (key.times // _EPOCH_MS * _EPOCH_MS).astype(np.int64)
+    starts, inverse = np.unique(epoch_ms, return_inverse=True)
+    labels = np.datetime_as_string(starts.astype("datetime64[ms]"), unit="s")
+    layout = (np.char.add(labels, "+00:00"), inverse, np.bincount(inverse), _et_weekend_mask(starts))
+    for arr in layout:
+        arr.flags.writeable = False
+    return layout
+
+
+# ── Dual EMA Computation ────────────────────────────────────────────────────
+
+def _ema_weights(n: int, alpha: float) -> np.ndarray:
+    """Weights w such that w @ values equals the EMA seeded at values[0].
+
+    Unrolling ema_k = alpha * v_k + (1 - alpha) * ema_{k-1} gives
+    ema = (1-alpha)^(n-1) * v_0 + sum_{i>=1} alpha * (1-alpha)^(n-1-i) * v_i.
+    """
+    decay = (1 - alpha) ** np.arange(n - 1, -1, -1, dtype=np.float64)
+    weights = alpha * decay
+    weights[0] = decay[0]
+    return weights
+
+
+# EMA windows are fixed by config, so their weight vectors are built once at
+# import; the per-coin EMA is then a single dot product with no setup.
+_EMA_3D_N, _EMA_7D_N = config.EMA_3D_EPOCHS, config.EMA_7D_EPOCHS
+_EMA_3D_W = _ema_weights(_EMA_3D_N, config.EMA_3D_ALPHA)
+_EMA_7D_W = _ema_weights(_EMA_7D_N, config.EMA_7D_ALPHA)
+# Both windows as rows of one matrix over the 7d window (3d row zero-padded
+# on the left), so a warm coin gets both EMAs from a single matmul.
+_DUAL_EMA_W = np.zeros((2, _EMA_7D_N))
+_DUAL_EMA_W[0, -_EMA_3D_N:] = _EMA_3D_W
+_DUAL_EMA_W[1] = _EMA_7D_W
+_SEAS_N = config.SEASONALITY_LOOKBACK_EPOCHS
+
+
+def compute_dual_ema(epochs_8h: EpochBlock | list[dict]) -> tuple[float | None, float | None]:
     """Compute 3-day and 7-day EMA from 8h epoch data.
 
     Returns (ema_3d, ema_7d) as APR percentages, or None if insufficient data.
     Requires at least 9 epochs for 3d EMA, at least 21 epochs for 7d EMA.
     No cold-start shortcuts — both windows must be fully populated.
     """
-    apr_values = [e["apr"] for e in epochs_8h]
+    apr_values = _apr_column(epochs_8h)
+    n = len(apr_values)
 
-    if len(apr_values) < config.EMA_3D_EPOCHS:
+    if n < _EMA_3D_N:
         return None, None
 
-    # 3-day EMA (9 epochs) — always computed from last 9
-    recent_3d = apr_values[-config.EMA_3D_EPOCHS:]
-    ema_3d = _ema(recent_3d, config.EMA_3D_ALPHA)
+    # 7-day EMA (21 epochs) — requires full window; 3-day EMA uses the last 9
+    if n >= _EMA_7D_N:
+        ema_3d, ema_7d = (_DUAL_EMA_W @ apr_values[-_EMA_7D_N:]).tolist()
+        return ema_3d, ema_7d
 
-    # 7-day EMA (21 epochs) — requires full window
-    if len(apr_values) < config.EMA_7D_EPOCHS:
-        return ema_3d, None
-
-    recent_7d = apr_values[-config.EMA_7D_EPOCHS:]
-    ema_7d = _ema(recent_7d, config.EMA_7D_ALPHA)
-
-    return ema_3d, ema_7d
+    return float(_EMA_3D_W @ apr_values[-_EMA_3D_N:]), None
 
 
 # ── Weekend Seasonality ─────────────────────────────────────────────────────
 
-def compute_weekend_seasonality(epochs_8h: list[dict]) -> float:
+def compute_weekend_seasonality(epochs_8h: EpochBlock | list[dict]) -> float:
     """Compute weekend seasonality multiplier from the last 28 days of data.
 
     Returns ratio of median_weekend / median_weekday APR.
     Default 1.0 if insufficient data.
     """
-    recent = epochs_8h[-config.SEASONALITY_LOOKBACK_EPOCHS:]
+    aprs = _apr_column(epochs_8h)[-_SEAS_N:]
+    weekend_mask = _weekend_column(epochs_8h)[-_SEAS_N:]
 
-    weekday_aprs = [e["apr"] for e in recent if not e.get("is_weekend")]
-    weekend_aprs = [e["apr"] for e in recent if e.get("is_weekend")]
+    weekend_aprs = aprs[weekend_mask]
+    weekday_aprs = aprs[~weekend_mask]
 
-    if len(weekday_aprs) < 3 or len(weekend_aprs) < 3:
+    if weekday_aprs.size < 3 or weekend_aprs.size < 3:
         return 1.0
 
-    median_weekday = statistics.median(weekday_aprs)
-    median_weekend = statistics.median(weekend_aprs)
+    median_weekday = float(np.median(weekday_aprs))
+    median_weekend = float(np.median(weekend_aprs))
 
     if median_weekday <= 0:
         return 1.0
@@ -200,6 +367,18 @@ def compute_weekend_seasonality(epochs_8h: list[dict]) -> float:
 
 # ── 72h Forecast ────────────────────────────────────────────────────────────
 
+# (w7d, w3d) blends indexed by is_weekend: [weekday, weekend]
+_FORECAST_W = (
+    (config.WEEKDAY_W7D, config.WEEKDAY_W3D),
+    (config.WEEKEND_W7D, config.WEEKEND_W3D),
+)
+
+
+def forecast_weights(is_weekend: bool) -> tuple[float, float]:
+    """(w7d, w3d) forecast blend for the current session type."""
+    return _FORECAST_W[bool(is_weekend)]
+
+
 def forecast_72h_apr(ema_3d: float, ema_7d: float, seasonality: float, is_weekend: bool) -> float:
     """Compute 72-hour forecast APR.
 
@@ -208,12 +387,8 @@ def forecast_72h_apr(ema_3d: float, ema_7d: float, seasonality: float, is_weeken
     Apply seasonality multiplier.
     Returns APR as percentage (e.g. 20.0 = 20%).
     """
-    if is_weekend:
-        r_hat = config.WEEKEND_W7D * ema_7d + config.WEEKEND_W3D * ema_3d
-    else:
-        r_hat = config.WEEKDAY_W7D * ema_7d + config.WEEKDAY_W3D * ema_3d
-
-    return r_hat * seasonality
+    w7d, w3d = forecast_weights(is_weekend)
+    return (w7d * ema_7d + w3d * ema_3d) * seasonality
 
 
 # ── Score Computation ───────────────────────────────────────────────────────
@@ -223,12 +398,184 @@ def compute_score(forecast_apr: float, impact_at_alloc: float) -> tuple[float, f
 
     Returns (score, fee_drag_apr, slippage_drag_apr) all as APR percentages.
     """
-    fee_drag = 2 * config.TAKER_FEE_PCT * config.REBALANCES_PER_YEAR * 100
+    fee_drag = config.FEE_DRAG_APR
     slip_drag = 2 * impact_at_alloc * config.REBALANCES_PER_YEAR * 100
     score = forecast_apr - fee_drag - slip_drag
     return score, fee_drag, slip_drag
 
 
+def _forecast_and_score(
+    ema_3d: np.ndarray, ema_7d: np.ndarray, seasonality: np.ndarray,
+    impact: np.ndarray, w7d: float, w3d: float,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Vectorized forecast_72h_apr + compute_score over all deep-scanned coins.
+
+    Returns (forecast_apr, score, slippage_drag_apr) arrays; the fee drag is
+    the scalar config.FEE_DRAG_APR for every coin.
+    """
+    forecast = (w7d * ema_7d + w3d * ema_3d) * seasonality
+    slip_drag = impact * (2 * config.REBALANCES_PER_YEAR * 100)
+    return forecast, forecast - config.FEE_DRAG_APR - slip_drag, slip_drag
+
+
+@dataclass(slots=True, frozen=True)
+class _Market:
+    """The market fields the scanner reads, normalized once per scan.
+
+    Missing numeric fields become 0 here, so the phases below read plain
+    attributes instead of re-probing the market dict with ``.get() or 0``.
+    """
+    coin: str
+    ticker: str
+    funding_apr: float
+    instant_apr: float        # funding_apr as a percentage, rounded to 2dp
+    funding_missing: bool
+    max_leverage: float
+    oi_usd: float
+    volume_24h: float
+    mark_px: float
+
+    @classmethod
+    def from_row(cls, m: dict) -> _Market:
+        funding_apr = m.get("funding_apr") or 0
+        return cls(
+            coin=m["coin"],
+            ticker=m["ticker"],
+            funding_apr=funding_apr,
+            instant_apr=round(funding_apr * 100, 2),
+            funding_missing=m.get("funding_missing", False),
+            max_leverage=m.get("max_leverage") or 0,
+            oi_usd=m.get("oi_usd") or 0,
+            volume_24h=m.get("volume_24h") or 0,
+            mark_px=m.get("mark_px") or 0,
+        )
+
+
+def _leverage_text(value: float) -> str:
+    """maxLeverage for reason strings: whole numbers without a trailing .0."""
+    value = float(value)
+    return str(int(value)) if value.is_integer() else str(value)
+
+
+# Pre-filter outcomes, in the order the gates are checked
+_GATE_PASS = 0
+_GATE_NO_HEDGE = 1
+_GATE_NON_STOCK = 2
+_GATE_LEVERAGE = 3
+_GATE_MISSING_FUNDING = 4
+_GATE_NONPOSITIVE_FUNDING = 5
+
+
+@dataclass
+class _MarketTable:
+    """Pre-filter view of the market universe: gate columns over the source markets.
+
+    Columns come straight from a MarketData's arrays (or one pass over legacy
+    dicts); a _Market is only built, via row(), for markets that need one.
+    """
+    source: hyperliquid.MarketData | list[dict]
+    coins: list[str]                  # normalized coin ids
+    tickers: list[str]
+    hedge_symbols: list[str | None]
+    funding_apr: np.ndarray           # 0 where funding is missing
+    funding_missing: np.ndarray
+    max_leverage: np.ndarray
+    oi_usd: np.ndarray
+    volume_24h: np.ndarray
+
+    @classmethod
+    def from_markets(cls, markets: hyperliquid.MarketData | list[dict]) -> _MarketTable:
+        if isinstance(markets, hyperliquid.MarketData):
+            raw_coins, tickers = markets.coin, markets.ticker
+            funding_missing = markets.funding_missing.astype(bool)
+            funding_apr = np.where(funding_missing, 0.0, markets.funding_apr)
+            max_leverage = markets.max_leverage.astype(np.float64)
+            oi_usd = markets.oi_usd.astype(np.float64)
+            volume_24h = markets.volume_24h.astype(np.float64)
+        else:
+            n = len(markets)
+            raw_coins = [m["coin"] for m in markets]
+            tickers = [m["ticker"] for m in markets]
+
+            def column(key: str) -> np.ndarray:
+                return np.fromiter((m.get(key) or 0 for m in markets), dtype=np.float64, count=n)
+
+            funding_missing = np.fromiter(
+                (bool(m.get("funding_missing", False)) for m in markets), dtype=bool, count=n,
+            )
+            funding_apr = column("funding_apr")
+            max_leverage = column("max_leverage")
+            oi_usd = column("oi_usd")
+            volume_24h = column("volume_24h")
+        coins = [config.normalize_coin(c) for c in raw_coins]
+        return cls(
+            source=markets,
+            coins=coins,
+            tickers=list(tickers),
+            hedge_symbols=[config.HEDGE_MAP.get(c) for c in coins],
+            funding_apr=funding_apr,
+            funding_missing=funding_missing,
+            max_leverage=max_leverage,
+            oi_usd=oi_usd,
+            volume_24h=volume_24h,
+        )
+
+    def row(self, i: int) -> _Market:
+        """The _Market for index i, built on demand."""
+        md = self.source
+        if not isinstance(md, hyperliquid.MarketData):
+            return _Market.from_row(md[i])
+        funding_apr = float(self.funding_apr[i])
+        return _Market(
+            coin=md.coin[i],
+            ticker=md.ticker[i],
+            funding_apr=funding_apr,
+            instant_apr=round(funding_apr * 100, 2),
+            funding_missing=bool(self.funding_missing[i]),
+            max_leverage=int(md.max_leverage[i]),
+            oi_usd=float(md.oi_usd[i]),
+            volume_24h=float(md.volume_24h[i]),
+            mark_px=float(md.mark_px[i]),
+        )
+
+    def gate_codes(self) -> np.ndarray:
+        """First failing pre-filter gate per market (_GATE_PASS if none)."""
+        n = len(self.coins)
+        no_hedge = np.fromiter((not h for h in self.hedge_symbols), dtype=bool, count=n)
+        if config.STOCK_ONLY_MODE:
+            non_stock = np.fromiter((c in config.NON_STOCK_COINS for c in self.coins), dtype=bool, count=n)
+        else:
+            non_stock = np.zeros(n, dtype=bool)
+        return np.select(
+            [
+                no_hedge,
+                non_stock,
+                self.max_leverage < config.MIN_MAX_LEVERAGE,
+                self.funding_missing,
+                self.funding_apr <= 0,
+            ],
+            [_GATE_NO_HEDGE, _GATE_NON_STOCK, _GATE_LEVERAGE, _GATE_MISSING_FUNDING, _GATE_NONPOSITIVE_FUNDING],
+            default=_GATE_PASS,
+        )
+
+
+class _ScanRow(NamedTuple):
+    """Per-coin deep-scan results awaiting the batched forecast/score pass."""
+    market: _Market
+    hedge_symbol: str
+    inst_apr: float
+    pre_rank: int
+    cap_oi: float
+    cap_vol: float
+    cap_impact: float
+    preliminary_cap: float
+    est_position: float
+    ema_3d: float
+    ema_7d: float
+    seasonality: float
+    impact_at_alloc: float
+
+
 # ── Full Scan Pipeline ──────────────────────────────────────────────────────
 
 def build_candidates(markets: list[dict], budget: float) -> ScanResult:
@@ -244,6 +591,8 @@ def build_candidates(markets: list[dict], budget: float) -> ScanResult:
     candidates = []
     rejected = []
     weekend = is_weekend_et()
+    w7d, w3d = forecast_weights(weekend)  # fixed for the whole scan
+    ts = db.utc_now()  # one updated_at for every EMA written this scan
 
     # Estimate initial per-asset allocation for impact calc
     buckets = config.compute_budget_buckets(budget)
@@ -251,79 +600,42 @@ def build_candidates(markets: list[dict], budget: float) -> ScanResult:
     est_alloc = h_max / config.MAX_NAMES
 
     # ── Phase 1: Fast pre-filter (no API calls) ────────────────────────────
-    pre_filtered = []
-    for m in markets:
-        coin = config.normalize_coin(m["coin"])
-        ticker = m["ticker"]
-
-        funding_missing = m.get("funding_missing", False)
-        raw_apr = m.get("funding_apr")
-        inst_funding_apr = round((raw_apr or 0) * 100, 2)  # as %
-
-        # Hedge mapping check
-        hedge_symbol = config.HEDGE_MAP.get(coin)
-        if not hedge_symbol:
-            rejected.append({
-                "coin": coin, "ticker": ticker,
-                "reason": "missing_hedge_mapping",
-                "instant_apr": inst_funding_apr,
-                "forecast_apr": None, "score": None, "cap_final": None, "pre_rank": None,
-            })
-            continue
-
-        # Stock-only filter
-        if config.STOCK_ONLY_MODE and coin in config.NON_STOCK_COINS:
+    table = _MarketTable.from_markets(markets)
+    gates = table.gate_codes()
+    for idx in np.flatnonzero(gates).tolist():
+        coin = table.coins[idx]
+        ticker = table.tickers[idx]
+        gate = gates[idx]
+        if gate == _GATE_NON_STOCK:
             rejected.append({
                 "coin": coin, "ticker": ticker,
                 "reason": "non_stock_market_excluded",
                 "forecast_apr": None, "score": None, "cap_final": None,
             })
             continue
-
-        # Hard gate: maxLeverage >= 10
-        max_lev = m.get("max_leverage") or 0
-        if max_lev < config.MIN_MAX_LEVERAGE:
-            rejected.append({
-                "coin": coin, "ticker": ticker,
-                "reason": f"maxLeverage {max_lev} < {config.MIN_MAX_LEVERAGE}",
-                "instant_apr": inst_funding_apr,
-                "forecast_apr": None, "score": None, "cap_final": None, "pre_rank": None,
-            })
-            continue
-
-        # Missing funding: API didn't return a usable funding value
-        if funding_missing:
-            rejected.append({
-                "coin": coin, "ticker": ticker,
-                "reason": "missing_live_funding",
-                "instant_apr": None,
-                "forecast_apr": None, "score": None, "cap_final": None, "pre_rank": None,
-            })
-            continue
-
-        # Skip negative/zero instantaneous funding (no point deep scanning)
-        if (raw_apr or 0) <= 0:
-            rejected.append({
-                "coin": coin, "ticker": ticker,
-                "reason": "negative/zero instantaneous funding",
-                "instant_apr": inst_funding_apr,
-                "forecast_apr": None, "score": None, "cap_final": None, "pre_rank": None,
-            })
-            continue
-
-        pre_filtered.append((m, hedge_symbol))
+        if gate == _GATE_NO_HEDGE:
+            reason = "missing_hedge_mapping"
+        elif gate == _GATE_LEVERAGE:
+            reason = f"maxLeverage {_leverage_text(table.max_leverage[idx])} < {config.MIN_MAX_LEVERAGE}"
+        elif gate == _GATE_MISSING_FUNDING:
+            reason = "missing_live_funding"
+        else:
+            reason = "negative/zero instantaneous funding"
+        rejected.append({
+            "coin": coin, "ticker": ticker,
+            "reason": reason,
+            "instant_apr": None if gate == _GATE_MISSING_FUNDING else round(float(table.funding_apr[idx]) * 100, 2),
+            "forecast_apr": None, "score": None, "cap_final": None, "pre_rank": None,
+        })
 
     # Sort by instantaneous funding APR descending (with liquidity tie-breakers).
     # Full-universe projection: deep-scan ALL pre-filtered markets (no cohort gate).
     # Stock universe is small (~26 mapped equities), so this is practical.
-    pre_filtered.sort(
-        key=lambda x: (
-            x[0].get("funding_apr") or 0,
-            x[0].get("volume_24h") or 0,
-            x[0].get("oi_usd") or 0,
-        ),
-        reverse=True,
-    )
+    # np.lexsort is stable and sorts by the last key first, so negating the
+    # keys gives the same order as a stable descending tuple sort.
+    passed = np.flatnonzero(gates == _GATE_PASS)
+    order = passed[np.lexsort((-table.oi_usd[passed], -table.volume_24h[passed], -table.funding_apr[passed]))]
+    pre_filtered = [(table.row(idx), table.hedge_symbols[idx]) for idx in order.tolist()]
 
     deep_scan_set = pre_filtered  # project all pre-filtered markets
     prefiltered_count = len(pre_filtered)
@@ -332,22 +644,41 @@ def build_candidates(markets: list[dict], budget: float) -> ScanResult:
              len(pre_filtered), len(rejected), len(deep_scan_set))
 
     # ── Phase 1.5: NASDAQ check (one fetch, cached for all) ────────────────
-    # Trigger the NASDAQ cache load once before the loop
-    if deep_scan_set:
-        try:
-            is_public_equity("AAPL")  # prime the cache
-        except Exception:
-            pass
-
-    # ── Phase 2: Deep scan (API calls per market) ──────────────────────────
+    # Resolve each hedge symbol once; the first lookup loads the directory
+    # (disk cache or network) and the rest are set hits on that snapshot.
+    is_public = {hedge_symbol: is_public_equity(hedge_symbol) for _, hedge_symbol in deep_scan_set}
+
+    # ── Phase 1.75: Network fetches for every public-equity market ────────
+    # Funding histories go to a thread pool while the L2 books are gathered
+    # on the event loop; Phase 2 below only consumes the results.
+    # Epochs already in the DB are reused: only hours from the start of each
+    # coin's latest stored epoch onward are fetched and re-aggregated.
+    fetch_coins = [m.coin for m, hedge_symbol in deep_scan_set if is_public[hedge_symbol]]
+    try:
+        stored_rows = db.get_recent_funding_epochs_8h_many(fetch_coins, _SEAS_N)
+    except Exception as e:
+        log.warning("Loading stored funding epochs failed, fetching full history: %s", e)
+        stored_rows = {}
+    stored = {coin: EpochBlock.from_records(rows) for coin, rows in stored_rows.items()}
+    with ThreadPoolExecutor(max_workers=FETCH_WORKERS, thread_name_prefix="deep-scan") as pool:
+        histories = {
+            coin: pool.submit(hyperliquid.fetch_funding_history, coin, _resume_time_ms(stored.get(coin)))
+            for coin in fetch_coins
+        }
+        books = hyperliquid.fetch_l2_books_bulk(fetch_coins)
+
+    # ── Phase 2: Deep scan (CPU work on prefetched data) ──────────────────
+    epoch_rows: list[tuple] = []
+    ema_rows: list[tuple[str, float, float]] = []
+    scored: list[_ScanRow] = []  # per-coin inputs for the Phase 3 scoring pass
     for ds_idx, (m, hedge_symbol) in enumerate(deep_scan_set):
-        coin = m["coin"]
-        ticker = m["ticker"]
+        coin = m.coin
+        ticker = m.ticker
         ds_rank = ds_idx + 1  # 1-based rank within deep-scan cohort
-        inst_apr = round((m.get("funding_apr") or 0) * 100, 2)
+        inst_apr = m.instant_apr
 
-        # NASDAQ check (uses cached data after first call)
-        if not is_public_equity(hedge_symbol):
+        # NASDAQ check (resolved in Phase 1.5)
+        if not is_public[hedge_symbol]:
             rejected.append({
                 "coin": coin, "ticker": ticker,
                 "reason": "not_in_public_directories",
@@ -358,18 +689,17 @@ def build_candidates(markets: list[dict], budget: float) -> ScanResult:
             continue
 
         # Compute soft caps from market data (no API call needed)
-        oi_usd = m.get("oi_usd") or 0
-        volume_24h = m.get("volume_24h") or 0
-        cap_oi = config.OI_CAP_FRACTION * oi_usd
-        cap_vol = config.VOLUME_CAP_FRACTION * volume_24h
+        cap_oi = config.OI_CAP_FRACTION * m.oi_usd
+        cap_vol = config.VOLUME_CAP_FRACTION * m.volume_24h
 
         # Fetch L2 book for impact cap — fail closed on missing data
         l2_failed = False
-        book = {"bids": [], "asks": []}
         cap_impact = 0.0
         try:
-            book = hyperliquid.fetch_l2_book(coin)
-            if not book.get("bids") or not book.get("asks"):
+            book = books[coin]
+            if isinstance(book, BaseException):
+                raise book
+            if not hyperliquid.book_has_both_sides(book):
                 l2_failed = True
             else:
                 cap_impact = hyperliquid.find_max_notional_for_impact(book, config.MAX_IMPACT_PCT)
@@ -391,8 +721,10 @@ def build_candidates(markets: list[dict], budget: float) -> ScanResult:
 
         # Fetch funding history → aggregate → dual EMA → forecast
         try:
-            history = hyperliquid.fetch_funding_history(coin)
-            if not history:
+            history = histories[coin].result()
+            delta = aggregate_to_8h_epochs(history) if history else EpochBlock.empty()
+            epochs = _merge_epochs(stored.get(coin), delta)
+            if len(epochs) == 0:
                 rejected.append({
                     "coin": coin, "ticker": ticker,
                     "reason": "no funding history",
@@ -401,13 +733,8 @@ def build_candidates(markets: list[dict], budget: float) -> ScanResult:
                 })
                 continue
 
-            epochs = aggregate_to_8h_epochs(history)
-
-            # Persist epochs to DB
-            for ep in epochs:
-                db.upsert_funding_epoch_8h(
-                    coin, ep["epoch_ts"], ep["rate_8h"], ep["apr"], ep["is_weekend"]
-                )
+            # Queue the new/updated epochs for the single DB write after the loop
+            epoch_rows.extend(delta.db_rows(coin))
 
             ema_3d, ema_7d = compute_dual_ema(epochs)
 
@@ -425,10 +752,9 @@ def build_candidates(markets: list[dict], budget: float) -> ScanResult:
                 continue
 
             seasonality = compute_weekend_seasonality(epochs)
-            forecast = forecast_72h_apr(ema_3d, ema_7d, seasonality, weekend)
 
-            # Save EMA to cache
-            db.upsert_ema(coin, ema_3d, ema_7d)
+            # Queue EMA for the cache write after the loop
+            ema_rows.append((coin, ema_3d, ema_7d))
 
         except Exception as e:
             log.warning("Funding/EMA computation failed for %s: %s", coin, e)
@@ -448,52 +774,76 @@ def build_candidates(markets: list[dict], budget: float) -> ScanResult:
         except Exception:
             impact_at_alloc = 1.0  # will trigger rejection below
 
-        # Gate: only score when impact is finite and in [0, 1)
-        if not (0 <= impact_at_alloc < 1) or est_position <= 0:
-            rejected.append({
-                "coin": coin, "ticker": ticker,
-                "reason": "insufficient_orderbook_depth",
-                "instant_apr": inst_apr, "pre_rank": ds_rank,
-                "forecast_apr": round(forecast, 2), "score": None,
-                "cap_final": round(preliminary_cap, 2),
-            })
-            continue
-
-        score, fee_drag, slip_drag = compute_score(forecast, impact_at_alloc)
+        scored.append(_ScanRow(
+            m, hedge_symbol, inst_apr, ds_rank, cap_oi, cap_vol, cap_impact,
+            preliminary_cap, est_position, ema_3d, ema_7d, seasonality, impact_at_alloc,
+        ))
 
-        # Skip negative-funding assets
-        if forecast <= 0:
-            rejected.append({
-                "coin": coin, "ticker": ticker,
-                "reason": "negative funding forecast",
-                "instant_apr": inst_apr, "pre_rank": ds_rank,
-                "forecast_apr": round(forecast, 2), "score": round(score, 2),
-                "cap_final": round(preliminary_cap, 2),
-            })
-            continue
+    # ── Phase 3: Forecast + score every deep-scanned coin in one pass ─────
+    n_scored = len(scored)
+    impacts = np.fromiter((r.impact_at_alloc for r in scored), dtype=np.float64, count=n_scored)
+    forecasts, scores, slip_drags = _forecast_and_score(
+        np.fromiter((r.ema_3d for r in scored), dtype=np.float64, count=n_scored),
+        np.fromiter((r.ema_7d for r in scored), dtype=np.float64, count=n_scored),
+        np.fromiter((r.seasonality for r in scored), dtype=np.float64, count=n_scored),
+        impacts, w7d, w3d,
+    )
+    est_positions = np.fromiter((r.est_position for r in scored), dtype=np.float64, count=n_scored)
+    # Depth gate first: only score when impact is finite and in [0, 1)
+    # (NaN fails both comparisons); then skip negative-funding assets
+    thin_book = ~((impacts >= 0) & (impacts < 1)) | (est_positions <= 0)
+    reject = thin_book | (forecasts <= 0)
+    forecasts, scores, slip_drags = forecasts.tolist(), scores.tolist(), slip_drags.tolist()
+
+    for i in np.flatnonzero(reject).tolist():
+        row = scored[i]
+        thin = bool(thin_book[i])
+        rejected.append({
+            "coin": row.market.coin, "ticker": row.market.ticker,
+            "reason": "insufficient_orderbook_depth" if thin else "negative funding forecast",
+            "instant_apr": row.inst_apr, "pre_rank": row.pre_rank,
+            "forecast_apr": round(forecasts[i], 2),
+            "score": None if thin else round(scores[i], 2),
+            "cap_final": round(row.preliminary_cap, 2),
+        })
 
+    fee_drag = config.FEE_DRAG_APR
+    for i in np.flatnonzero(~reject).tolist():
+        row = scored[i]
+        m = row.market
         candidates.append(Candidate(
-            coin=coin,
-            ticker=ticker,
-            hedge_symbol=hedge_symbol,
-            ema_3d=round(ema_3d, 2),
-            ema_7d=round(ema_7d, 2),
-            weekend_mult=round(seasonality, 4),
-            forecast_apr=round(forecast, 2),
-            score=round(score, 2),
-            fee_drag_apr=round(fee_drag, 2),
-            slippage_drag_apr=round(slip_drag, 2),
-            cap_oi=round(cap_oi, 2),
-            cap_vol=round(cap_vol, 2),
-            cap_impact=round(cap_impact, 2),
-            oi_usd=oi_usd,
-            volume_24h=volume_24h,
-            max_leverage=m.get("max_leverage") or 0,
-            mark_px=m.get("mark_px") or 0,
+            coin=m.coin,
+            ticker=m.ticker,
+            hedge_symbol=row.hedge_symbol,
+            ema_3d=row.ema_3d,
+            ema_7d=row.ema_7d,
+            weekend_mult=row.seasonality,
+            forecast_apr=forecasts[i],
+            score=scores[i],
+            fee_drag_apr=fee_drag,
+            slippage_drag_apr=slip_drags[i],
+            cap_oi=row.cap_oi,
+            cap_vol=row.cap_vol,
+            cap_impact=row.cap_impact,
+            oi_usd=m.oi_usd,
+            volume_24h=m.volume_24h,
+            max_leverage=m.max_leverage,
+            mark_px=m.mark_px,
         ))
 
-    # Sort by score descending
-    candidates.sort(key=lambda c: c.score, reverse=True)
+    # Persist every scanned coin's epochs and EMAs, one transaction each
+    try:
+        db.upsert_funding_epoch_8h_many(epoch_rows)
+    except Exception as e:
+        log.warning("Persisting %d funding epochs failed: %s", len(epoch_rows), e)
+    try:
+        db.upsert_ema_many(ema_rows, ts)
+    except Exception as e:
+        log.warning("Persisting %d EMAs failed: %s", len(ema_rows), e)
+
+    # Round once for the whole batch, then sort by the rounded score descending
+    _round_candidates(candidates)
+    candidates.sort(key=attrgetter("score"), reverse=True)
 
     # Projection coverage: what fraction of pre-filtered markets got projected
     projected = len(candidates) + len([
@@ -0,0 +1,26 @@
+"""Shared helpers for tests that inspect ui.py without importing it."""
+
+import ast
+import re
+from functools import lru_cache
+
+
+_REASON_LABELS_RE = re.compile(r"^_REASON_LABELS\s*=\s*(\{.*?^\})", re.S | re.M)
+
+
+@lru_cache(maxsize=1)
+def ui_source() -> str:
+    """ui.py source, read from disk once per session."""
+    with open("ui.py") as f:
+        return f.read()
+
+
+@lru_cache(maxsize=1)
+def ui_reason_labels() -> dict:
+    """_REASON_LABELS from ui.py, without running Streamlit."""
+    # We can't import ui.py directly (it calls st.set_page_config at import).
+    # Instead, cut the dict literal out of the source and evaluate just that.
+    match = _REASON_LABELS_RE.search(ui_source())
+    if match is None:
+        raise RuntimeError("_REASON_LABELS not found in ui.py")
+    return ast.literal_eval(match.group(1))
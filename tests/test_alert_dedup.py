@@ -0,0 +1,56 @@
+"""Tests for alert deduplication windows."""
+
+from datetime import datetime, timedelta, timezone
+from unittest.mock import patch
+
+import config
+from engine import alerts
+
+
+def _last(age_minutes: float, acknowledged: int = 0, with_ms: bool = True) -> dict:
+    sent = datetime.now(timezone.utc) - timedelta(minutes=age_minutes)
+    row = {"sent_at": sent.isoformat(), "acknowledged": acknowledged}
+    if with_ms:
+        row["sent_at_ms"] = int(sent.timestamp() * 1000)
+    return row
+
+
+def test_no_previous_alert_sends():
+    with patch("engine.alerts.db.get_last_alert", return_value=None):
+        assert alerts._should_send("TSLA", "OPPORTUNITY")
+
+
+def test_opportunity_within_dedup_window_suppressed():
+    recent = _last(config.OPPORTUNITY_DEDUP_HOURS * 60 - 5)
+    stale = _last(config.OPPORTUNITY_DEDUP_HOURS * 60 + 5)
+    with patch("engine.alerts.db.get_last_alert", return_value=recent):
+        assert not alerts._should_send("TSLA", "OPPORTUNITY")
+    with patch("engine.alerts.db.get_last_alert", return_value=stale):
+        assert alerts._should_send("TSLA", "OPPORTUNITY")
+
+
+def test_critical_resend_and_acknowledge():
+    with patch("engine.alerts.db.get_last_alert", return_value=_last(1)):
+        assert not alerts._should_send("SYSTEM", "CRITICAL")
+    with patch("engine.alerts.db.get_last_alert",
+               return_value=_last(config.CRITICAL_RESEND_MINUTES + 1)):
+        assert alerts._should_send("SYSTEM", "CRITICAL")
+    with patch("engine.alerts.db.get_last_alert",
+               return_value=_last(config.CRITICAL_RESEND_MINUTES + 1, acknowledged=1)):
+        assert not alerts._should_send("SYSTEM", "CRITICAL")
+
+
+def test_legacy_rows_without_epoch_ms():
+    """Rows written before sent_at_ms existed fall back to the ISO timestamp."""
+    with patch("engine.alerts.db.get_last_alert", return_value=_last(1, with_ms=False)):
+        assert not alerts._should_send("SYSTEM", "CRITICAL")
+
+
+def test_send_pushover_returns_delivery_future(monkeypatch):
+    """The caller gets a Future for the background POST, not an unconditional True."""
+    monkeypatch.setattr(config, "PUSHOVER_APP_TOKEN", "t")
+    monkeypatch.setattr(config, "PUSHOVER_USER_KEY", "u")
+    with patch.object(alerts._PUSHOVER_CLIENT, "post", side_effect=RuntimeError("down")):
+        assert alerts._send_pushover("title", "msg").result(timeout=5) is False
+    monkeypatch.setattr(config, "PUSHOVER_APP_TOKEN", "")
+    assert alerts._send_pushover("title", "msg") is None
@@ -1,5 +1,7 @@
 """Tests for budget computation and low-budget no-allocation path."""
 
+import pytest
+
 import config
 from engine.allocator import build_portfolio
 
@@ -62,7 +64,7 @@ def test_low_budget_no_allocation():
     portfolio = build_portfolio([], 10_000)
     assert portfolio.num_positions == 0
     assert portfolio.total_hedge_notional == 0
-    assert portfolio.positions == []
+    assert portfolio.positions == ()
 
 
 def test_dust_threshold():
@@ -90,3 +92,12 @@ def test_emergency_floor_deprecated():
     b = config.compute_budget_buckets(25_000)
     assert b["emergency"] != config.EMERGENCY_FLOOR
     assert b["emergency"] == 0.08 * 25_000
+
+
+def test_budget_buckets_cached_and_read_only():
+    """Repeated calls share one cached, immutable result."""
+    b1 = config.compute_budget_buckets(640_000)
+    b2 = config.compute_budget_buckets(640_000)
+    assert b1 is b2
+    with pytest.raises(TypeError):
+        b1["h_max"] = 0
@@ -2,30 +2,31 @@
 
 import os
 import sqlite3
-import threading
 
 import config
 import db
 
+_ORIGINAL_DB_PATH = config.DB_PATH
+
 
 def _setup_fresh_db(path: str):
     """Point db module at a fresh test DB."""
+    db.close_all()
     if os.path.exists(path):
         os.remove(path)
     config.DB_PATH = path
-    db._local = threading.local()
 
 
 def _teardown(path: str):
-    """Clean up test DB."""
-    db._local = threading.local()
-    if os.path.exists(path):
-        os.remove(path)
+    """Flush queued alerts, close every connection (removing WAL/SHM) and restore DB_PATH."""
+    db.flush_alerts()
+    db.close_all()
+    config.DB_PATH = _ORIGINAL_DB_PATH
 
 
-def test_fresh_db_has_all_columns():
+def test_fresh_db_has_all_columns(tmp_path):
     """Fresh database should include all schema columns."""
-    path = "data/test_fresh_cols.sqlite"
+    path = str(tmp_path / "fresh_cols.sqlite")
     try:
         _setup_fresh_db(path)
         db.init_db()
@@ -43,9 +44,9 @@ def test_fresh_db_has_all_columns():
         _teardown(path)
 
 
-def test_legacy_db_migrates():
+def test_legacy_db_migrates(tmp_path):
     """Old DB without new columns should gain them after init_db."""
-    path = "data/test_legacy_migrate.sqlite"
+    path = str(tmp_path / "legacy_migrate.sqlite")
     try:
         if os.path.exists(path):
             os.remove(path)
@@ -100,21 +101,21 @@ def test_legacy_db_migrates():
         _teardown(path)
 
 
-def test_migration_idempotent():
+def test_migration_idempotent(tmp_path):
     """Running init_db twice should not error."""
-    path = "data/test_idempotent.sqlite"
+    path = str(tmp_path / "idempotent.sqlite")
     try:
         _setup_fresh_db(path)
         db.init_db()
-        db._local = threading.local()
+        db.close_all()
         db.init_db()  # second call should be no-op
     finally:
         _teardown(path)
 
 
-def test_crud_after_migration():
+def test_crud_after_migration(tmp_path):
     """CRUD operations should work after migration."""
-    path = "data/test_crud.sqlite"
+    path = str(tmp_path / "crud.sqlite")
     try:
         _setup_fresh_db(path)
         db.init_db()
@@ -138,3 +139,285 @@ def test_crud_after_migration():
         assert rejected[0]["pre_rank"] == 3
     finally:
         _teardown(path)
+
+
+def test_batch_replace_writers(tmp_path):
+    """Batch writers replace whole tables in one transaction, mixed column sets included."""
+    path = str(tmp_path / "batch_replace.sqlite")
+    try:
+        _setup_fresh_db(path)
+        db.init_db()
+
+        db.upsert_market_snapshots([
+            ("AAA", {"coin": "xyz:AAA", "funding_apr": 0.2}),
+            ("BBB", {"coin": "xyz:BBB", "funding_apr": 0.1, "oi_usd": 5e5}),
+        ], "2025-01-01T00:00:00+00:00")
+        snaps = db.get_all_market_snapshots()
+        assert [s["ticker"] for s in snaps] == ["AAA", "BBB"]
+        assert snaps[1]["oi_usd"] == 5e5
+        assert {s["updated_at"] for s in snaps} == {"2025-01-01T00:00:00+00:00"}
+
+        db.replace_portfolio_positions([
+            ("xyz:OLD", {"ticker": "OLD", "hedge_symbol": "OLD", "rank": 1, "alloc_notional": 1000.0, "alloc_pct": 0.5}),
+        ])
+        db.replace_portfolio_positions([
+            ("xyz:AAA", {"ticker": "AAA", "hedge_symbol": "AAA", "rank": 1, "alloc_notional": 2000.0, "alloc_pct": 1.0}),
+            ("xyz:BBB", {"ticker": "BBB", "hedge_symbol": "BBB", "rank": 2, "alloc_notional": 1000.0, "alloc_pct": 0.5}),
+        ])
+        assert [p["coin"] for p in db.get_portfolio_positions()] == ["xyz:AAA", "xyz:BBB"]
+
+        db.replace_rejected_markets([
+            ("xyz:CCC", {"ticker": "CCC", "reason": "r1", "forecast_apr": 5.0}),
+            ("xyz:DDD", {"ticker": "DDD", "reason": "r2"}),
+        ])
+        db.replace_rejected_markets([("xyz:EEE", {"ticker": "EEE", "reason": "r3"})])
+        assert [r["coin"] for r in db.get_rejected_markets()] == ["xyz:EEE"]
+    finally:
+        _teardown(path)
+
+
+def test_bulk_epoch_upsert(tmp_path):
+    """Bulk epoch upsert should write all rows and replace on conflict."""
+    path = str(tmp_path / "bulk_epochs.sqlite")
+    try:
+        _setup_fresh_db(path)
+        db.init_db()
+
+        db.upsert_funding_epoch_8h_many([
+            ("xyz:TEST", "2025-01-01T00:00:00+00:00", 0.0001, 87.6, False),
+            ("xyz:TEST", "2025-01-01T08:00:00+00:00", 0.0002, 175.2, True),
+        ])
+        db.upsert_funding_epoch_8h_many([
+            ("xyz:TEST", "2025-01-01T08:00:00+00:00", 0.0003, 262.8, True),
+        ])
+        epochs = db.get_funding_epochs_8h("xyz:TEST")
+        assert len(epochs) == 2
+        assert epochs[1]["apr"] == 262.8
+        assert epochs[1]["is_weekend"] == 1
+    finally:
+        _teardown(path)
+
+
+def test_recent_epochs_many_limits_per_coin(tmp_path):
+    """One query returns each coin's latest epochs, oldest first."""
+    path = str(tmp_path / "recent_epochs.sqlite")
+    try:
+        _setup_fresh_db(path)
+        db.init_db()
+
+        db.upsert_funding_epoch_8h_many([
+            (coin, f"2025-01-0{d}T00:00:00+00:00", 0.0001 * d, 87.6 * d, False)
+            for coin in ("xyz:A", "xyz:B") for d in range(1, 6)
+        ])
+        recent = db.get_recent_funding_epochs_8h_many(["xyz:A", "xyz:B", "xyz:NONE"], limit=3)
+        assert set(recent) == {"xyz:A", "xyz:B"}
+        assert [r["epoch_ts"][:10] for r in recent["xyz:A"]] == ["2025-01-03", "2025-01-04", "2025-01-05"]
+        assert db.get_recent_funding_epochs_8h_many([]) == {}
+    finally:
+        _teardown(path)
+
+
+def test_last_alert_cache_invalidated_on_write(tmp_path):
+    """Cached dedup lookups must reflect new alerts and acknowledgements."""
+    path = str(tmp_path / "alert_cache.sqlite")
+    try:
+        _setup_fresh_db(path)
+        db.init_db()
+
+        assert db.get_last_alert("TSLA", "CRITICAL") is None
+        db.insert_alert("TSLA", "CRITICAL", "first")
+        # Queued alert is visible to dedup before it is flushed
+        pending = db.get_last_alert("TSLA", "CRITICAL")
+        assert pending["acknowledged"] == 0
+
+        db.flush_alerts()
+        last = db.get_last_alert("TSLA", "CRITICAL")
+        assert last["sent_at_ms"] == pending["sent_at_ms"]
+        assert last["acknowledged"] == 0
+
+        alert_id = db.get_unacknowledged_criticals()[0]["id"]
+        db.acknowledge_alert(alert_id)
+        assert db.get_last_alert("TSLA", "CRITICAL")["acknowledged"] == 1
+    finally:
+        _teardown(path)
+
+
+def test_batch_write_keeps_newer_pending_alert(tmp_path):
+    """Committing an older batch must not evict a newer alert still in the queue."""
+    import time
+
+    path = str(tmp_path / "alert_race.sqlite")
+    try:
+        _setup_fresh_db(path)
+        db.init_db()
+
+        db.insert_alert("TSLA", "OPPORTUNITY", "first")
+        batch = [db._alert_queue.get_nowait()]  # flusher has taken the first row
+        time.sleep(0.002)
+        db.insert_alert("TSLA", "OPPORTUNITY", "second")
+        newer = db.get_last_alert("TSLA", "OPPORTUNITY")
+
+        db._write_alerts(batch)
+        assert db.get_last_alert("TSLA", "OPPORTUNITY")["sent_at_ms"] == newer["sent_at_ms"]
+        db.flush_alerts()
+        assert db.get_last_alert("TSLA", "OPPORTUNITY")["sent_at_ms"] == newer["sent_at_ms"]
+    finally:
+        _teardown(path)
+
+
+def test_pending_alert_survives_acknowledge_and_prune(tmp_path):
+    """Invalidating the read-through cache must keep queued alerts visible to dedup."""
+    path = str(tmp_path / "alert_pending_ack.sqlite")
+    try:
+        _setup_fresh_db(path)
+        db.init_db()
+
+        db.insert_alert("NVDA", "CRITICAL", "other")
+        db.flush_alerts()
+        other_id = db.get_unacknowledged_criticals()[0]["id"]
+
+        db.insert_alert("TSLA", "CRITICAL", "queued")
+        pending = db.get_last_alert("TSLA", "CRITICAL")
+        db.acknowledge_alert(other_id)
+        assert db.get_last_alert("TSLA", "CRITICAL") is pending
+        db.prune_alert_history()
+        assert db.get_last_alert("TSLA", "CRITICAL") is pending
+    finally:
+        _teardown(path)
+
+
+def test_pending_alert_not_evicted_by_lru(tmp_path):
+    """Read-through misses on many keys can't evict an alert that is not on disk yet."""
+    path = str(tmp_path / "alert_pending_lru.sqlite")
+    try:
+        _setup_fresh_db(path)
+        db.init_db()
+
+        db.insert_alert("TSLA", "OPPORTUNITY", "queued")
+        pending = db.get_last_alert("TSLA", "OPPORTUNITY")
+        for i in range(db._LAST_ALERT_CACHE_SIZE + 10):
+            db.get_last_alert(f"T{i}", "OPPORTUNITY")
+        assert db.get_last_alert("TSLA", "OPPORTUNITY") is pending
+    finally:
+        _teardown(path)
+
+
+def test_last_alert_read_does_not_cache_over_concurrent_write(tmp_path, monkeypatch):
+    """A DB read that races an alert write must not cache its stale result."""
+    path = str(tmp_path / "alert_read_race.sqlite")
+    try:
+        _setup_fresh_db(path)
+        db.init_db()
+
+        real_fetch = db._fetch_dict
+
+        def fetch_then_alert(cursor):
+            row = real_fetch(cursor)
+            monkeypatch.setattr(db, "_fetch_dict", real_fetch)
+            db.insert_alert("TSLA", "OPPORTUNITY", "raced")
+            db.flush_alerts()
+            return row
+
+        monkeypatch.setattr(db, "_fetch_dict", fetch_then_alert)
+        assert db.get_last_alert("TSLA", "OPPORTUNITY") is None
+        assert db.get_last_alert("TSLA", "OPPORTUNITY") is not None
+    finally:
+        _teardown(path)
+
+
+def test_critical_ack_from_another_process_is_seen(tmp_path):
+    """CRITICAL lookups re-read the acknowledged flag instead of serving it from cache."""
+    path = str(tmp_path / "alert_ack_xproc.sqlite")
+    try:
+        _setup_fresh_db(path)
+        db.init_db()
+
+        db.insert_alert("TSLA", "CRITICAL", "down")
+        db.flush_alerts()
+        assert db.get_last_alert("TSLA", "CRITICAL")["acknowledged"] == 0
+
+        other = sqlite3.connect(path)
+        with other:
+            other.execute("UPDATE alert_history SET acknowledged = 1")
+        other.close()
+        assert db.get_last_alert("TSLA", "CRITICAL")["acknowledged"] == 1
+    finally:
+        _teardown(path)
+
+
+def test_schema_version_recorded(tmp_path):
+    """init_db stamps PRAGMA user_version with the current schema version."""
+    path = str(tmp_path / "user_version.sqlite")
+    try:
+        _setup_fresh_db(path)
+        db.init_db()
+        conn = sqlite3.connect(path)
+        assert conn.execute("PRAGMA user_version").fetchone()[0] == db._SCHEMA_VERSION
+        conn.close()
+    finally:
+        _teardown(path)
+
+
+def test_prune_alert_history_keeps_open_criticals(tmp_path):
+    """Pruning drops old resolved alerts but never unacknowledged criticals."""
+    path = str(tmp_path / "prune_alerts.sqlite")
+    try:
+        _setup_fresh_db(path)
+        db.init_db()
+
+        old_ts = "2000-01-01T00:00:00+00:00"
+        with db.get_db() as conn:
+            conn.executemany(
+                "INSERT INTO alert_history (ticker, severity, message, sent_at, acknowledged) "
+                "VALUES (?, ?, ?, ?, ?)",
+                [
+                    ("A", "INFO", "old info", old_ts, 0),
+                    ("B", "CRITICAL", "old acked", old_ts, 1),
+                    ("C", "CRITICAL", "old open", old_ts, 0),
+                ],
+            )
+        db.insert_alert("D", "INFO", "fresh")
+        db.flush_alerts()
+
+        assert db.prune_alert_history(days=30) == 2
+        remaining = sqlite3.connect(path).execute(
+            "SELECT ticker FROM alert_history ORDER BY ticker"
+        ).fetchall()
+        assert [r[0] for r in remaining] == ["C", "D"]
+    finally:
+        _teardown(path)
+
+
+def test_upsert_ema_many(tmp_path):
+    """Batched EMA upsert inserts new coins and overwrites existing ones."""
+    path = str(tmp_path / "ema_many.sqlite")
+    try:
+        _setup_fresh_db(path)
+        db.init_db()
+
+        db.upsert_ema("xyz:TSLA", 21.0, 18.0)
+        db.upsert_ema_many([("xyz:TSLA", 22.0, 19.0), ("xyz:NVDA", 9.0, 8.0)], "2025-01-01T00:00:00+00:00")
+        assert (db.get_ema("xyz:TSLA")["ema_3d"], db.get_ema("xyz:NVDA")["ema_7d"]) == (22.0, 8.0)
+        assert db.get_all_emas() == {"xyz:TSLA": (22.0, 19.0), "xyz:NVDA": (9.0, 8.0)}
+    finally:
+        _teardown(path)
+
+
+def test_close_all_releases_connections_and_wal(tmp_path):
+    """close_all drains the read pools and closes RW connections; WAL/SHM go away."""
+    path = str(tmp_path / "close_all.sqlite")
+    try:
+        _setup_fresh_db(path)
+        db.init_db()
+        db.update_portfolio_targets(run_status="success")
+        assert db.get_portfolio_targets()["run_status"] == "success"
+        assert os.path.exists(path + "-wal")
+
+        db.close_all()
+        assert not os.path.exists(path + "-wal")
+        assert not os.path.exists(path + "-shm")
+        assert db._ro_pools == {}
+        # Connections reopen transparently afterwards
+        assert db.get_portfolio_targets()["run_status"] == "success"
+    finally:
+        _teardown(path)
@@ -3,8 +3,13 @@
 All tests are deterministic with mocked external dependencies (no network calls).
 """
 
+import time
+from functools import lru_cache
+from types import SimpleNamespace
 from unittest.mock import patch
 
+import pytest
+
 import config
 
 
@@ -27,9 +32,8 @@ def test_scanner_uses_config_values():
 
 def _make_stock_markets(n: int) -> list[dict]:
     """Create n synthetic markets from HEDGE_MAP with descending funding."""
-    stock_coins = [c for c in config.HEDGE_MAP if c not in config.NON_STOCK_COINS]
     markets = []
-    for i, coin in enumerate(stock_coins[:n]):
+    for i, coin in enumerate(config.STOCK_COINS_ORDERED[:n]):
         ticker = coin.split(":")[-1]
         markets.append({
             "coin": coin,
@@ -43,32 +47,51 @@ def _make_stock_markets(n: int) -> list[dict]:
     return markets
 
 
-def _mock_funding_history(coin: str, start_time_ms: int = 0) -> list[dict]:
-    """Return synthetic hourly funding entries (enough for dual EMA)."""
-    import time
-    base_ts = int(time.time() * 1000) - 25 * 3600 * 1000
+# Built once per module: the scanner only reads these, so calls can share them
+_BASE_TS = int(time.time() * 1000) - 25 * 3600 * 1000
+_L2_BOOK = {
+    "bids": [{"px": 100.0 - i * 0.1, "sz": 500} for i in range(20)],
+    "asks": [{"px": 100.0 + i * 0.1, "sz": 500} for i in range(20)],
+}
+
+
+@lru_cache(maxsize=None)
+def _funding_entries(coin: str) -> list[dict]:
     return [
-        {"coin": coin, "fundingRate": 0.0001, "time": base_ts + i * 3600_000}
+        {"coin": coin, "fundingRate": 0.0001, "time": _BASE_TS + i * 3600_000}
         for i in range(200)
     ]
 
 
+def _mock_funding_history(coin: str, start_time_ms: int = 0) -> list[dict]:
+    """Return synthetic hourly funding entries (enough for dual EMA)."""
+    return _funding_entries(coin)
+
+
 def _mock_l2_book(coin: str) -> dict:
     """Return synthetic L2 book with reasonable depth."""
-    return {
-        "bids": [{"px": 100.0 - i * 0.1, "sz": 500} for i in range(20)],
-        "asks": [{"px": 100.0 + i * 0.1, "sz": 500} for i in range(20)],
-    }
-
-
-@patch("engine.scanner.hyperliquid.fetch_l2_book", side_effect=_mock_l2_book)
-@patch("engine.scanner.hyperliquid.fetch_funding_history", side_effect=_mock_funding_history)
-@patch("engine.scanner.db.upsert_funding_epoch_8h")
-@patch("engine.scanner.db.upsert_ema")
-@patch("engine.equity.is_public_equity", return_value=True)
-def test_all_prefiltered_markets_get_projected(
-    mock_equity, mock_ema, mock_epoch, mock_funding, mock_l2
-):
+    return _L2_BOOK
+
+
+def _mock_l2_books_bulk(coins: list[str]) -> dict[str, dict]:
+    return {coin: _mock_l2_book(coin) for coin in coins}
+
+
+@pytest.fixture
+def scan_mocks():
+    """Mock every external call build_candidates makes; tests tweak side effects as needed."""
+    with (
+        patch("engine.scanner.db.get_recent_funding_epochs_8h_many", return_value={}) as stored,
+        patch("engine.scanner.hyperliquid.fetch_l2_books_bulk", side_effect=_mock_l2_books_bulk) as l2,
+        patch("engine.scanner.hyperliquid.fetch_funding_history", side_effect=_mock_funding_history) as funding,
+        patch("engine.scanner.db.upsert_funding_epoch_8h_many") as epoch,
+        patch("engine.scanner.db.upsert_ema_many") as ema,
+        patch("engine.equity.is_public_equity", return_value=True) as equity,
+    ):
+        yield SimpleNamespace(stored=stored, l2=l2, funding=funding, epoch=epoch, ema=ema, equity=equity)
+
+
+def test_all_prefiltered_markets_get_projected(scan_mocks):
     """Full-universe projection: every pre-filtered market gets forecast+score."""
     from engine.scanner import build_candidates
 
@@ -78,20 +101,15 @@ def test_all_prefiltered_markets_get_projected(
     # deep_scan_cohort == prefiltered_count (no cohort gating)
     assert result.deep_scan_cohort == result.prefiltered_count
     assert result.deep_scan_cohort == 20
+    # One directory lookup per hedge symbol, no separate priming call
+    assert scan_mocks.equity.call_count == 20
 
     # No market should have "outside top funding cohort" reason
     skipped = [r for r in result.rejected if "outside top funding cohort" in r.get("reason", "")]
     assert len(skipped) == 0
 
 
-@patch("engine.scanner.hyperliquid.fetch_l2_book", side_effect=_mock_l2_book)
-@patch("engine.scanner.hyperliquid.fetch_funding_history", side_effect=_mock_funding_history)
-@patch("engine.scanner.db.upsert_funding_epoch_8h")
-@patch("engine.scanner.db.upsert_ema")
-@patch("engine.equity.is_public_equity", return_value=True)
-def test_projection_coverage_100_pct(
-    mock_equity, mock_ema, mock_epoch, mock_funding, mock_l2
-):
+def test_projection_coverage_100_pct(scan_mocks):
     """With all APIs mocked successfully, projection_coverage should be 1.0."""
     from engine.scanner import build_candidates
 
@@ -102,14 +120,7 @@ def test_projection_coverage_100_pct(
     assert result.prefiltered_count == 5
 
 
-@patch("engine.scanner.hyperliquid.fetch_l2_book", side_effect=_mock_l2_book)
-@patch("engine.scanner.hyperliquid.fetch_funding_history", side_effect=_mock_funding_history)
-@patch("engine.scanner.db.upsert_funding_epoch_8h")
-@patch("engine.scanner.db.upsert_ema")
-@patch("engine.equity.is_public_equity", return_value=True)
-def test_deep_scanned_markets_get_forecast(
-    mock_equity, mock_ema, mock_epoch, mock_funding, mock_l2
-):
+def test_deep_scanned_markets_get_forecast(scan_mocks):
     """Every deep-scanned market gets forecast_apr and score (or explicit rejection)."""
     from engine.scanner import build_candidates
 
@@ -130,14 +141,7 @@ def test_deep_scanned_markets_get_forecast(
     assert total == 5
 
 
-@patch("engine.scanner.hyperliquid.fetch_l2_book", side_effect=_mock_l2_book)
-@patch("engine.scanner.hyperliquid.fetch_funding_history", side_effect=_mock_funding_history)
-@patch("engine.scanner.db.upsert_funding_epoch_8h")
-@patch("engine.scanner.db.upsert_ema")
-@patch("engine.equity.is_public_equity", return_value=True)
-def test_candidates_sorted_by_score(
-    mock_equity, mock_ema, mock_epoch, mock_funding, mock_l2
-):
+def test_candidates_sorted_by_score(scan_mocks):
     """Final candidates list must be sorted by score descending."""
     from engine.scanner import build_candidates
 
@@ -148,14 +152,45 @@ def test_candidates_sorted_by_score(
     assert scores == sorted(scores, reverse=True)
 
 
-@patch("engine.scanner.hyperliquid.fetch_l2_book", side_effect=_mock_l2_book)
-@patch("engine.scanner.hyperliquid.fetch_funding_history", side_effect=_mock_funding_history)
-@patch("engine.scanner.db.upsert_funding_epoch_8h")
-@patch("engine.scanner.db.upsert_ema")
-@patch("engine.equity.is_public_equity", return_value=True)
-def test_scan_result_has_coverage_fields(
-    mock_equity, mock_ema, mock_epoch, mock_funding, mock_l2
-):
+def test_round_candidates_batch():
+    """Presentational fields are rounded in one pass after the scan loop."""
+    from engine.scanner import Candidate, _round_candidates
+
+    c = Candidate(
+        coin="xyz:AAPL", ticker="AAPL", hedge_symbol="AAPL",
+        ema_3d=12.3456, ema_7d=10.0049, weekend_mult=0.987654,
+        forecast_apr=11.111, score=7.777, fee_drag_apr=3.14159,
+        slippage_drag_apr=0.004, cap_oi=1234.567, cap_vol=99.999, cap_impact=50000.0049,
+        oi_usd=1e6, volume_24h=5e5, max_leverage=20, mark_px=187.123456,
+    )
+    _round_candidates([c])
+    assert (c.ema_3d, c.ema_7d, c.forecast_apr, c.score) == (12.35, 10.0, 11.11, 7.78)
+    assert (c.fee_drag_apr, c.slippage_drag_apr) == (3.14, 0.0)
+    assert (c.cap_oi, c.cap_vol, c.cap_impact) == (1234.57, 100.0, 50000.0)
+    assert c.weekend_mult == 0.9877
+    assert c.mark_px == 187.123456  # pass-through fields are untouched
+    assert type(c.score) is float
+    assert not hasattr(c, "__dict__")  # slotted dataclass
+
+
+def test_round_candidates_uses_numpy_half_cent_rounding():
+    """Half-cent ties follow np.round on the scaled value, not builtin round()."""
+    from engine.scanner import Candidate, _round_candidates
+
+    c = Candidate(
+        coin="xyz:AAPL", ticker="AAPL", hedge_symbol="AAPL",
+        ema_3d=2.675, ema_7d=1234.565, weekend_mult=1.0,
+        forecast_apr=1.115, score=0.125, fee_drag_apr=0.0,
+        slippage_drag_apr=0.0, cap_oi=0.0, cap_vol=0.0, cap_impact=0.0,
+        oi_usd=1e6, volume_24h=5e5, max_leverage=20, mark_px=100.0,
+    )
+    _round_candidates([c])
+    assert (c.ema_3d, c.ema_7d, c.forecast_apr, c.score) == (2.68, 1234.56, 1.12, 0.12)
+    # builtin round() would give 2.67 / 1234.57 / 1.11 for the first three
+    assert (round(2.675, 2), round(1234.565, 2), round(1.115, 2)) == (2.67, 1234.57, 1.11)
+
+
+def test_scan_result_has_coverage_fields(scan_mocks):
     """ScanResult must expose prefiltered_count and projection_coverage."""
     from engine.scanner import build_candidates
 
@@ -166,3 +201,165 @@ def test_scan_result_has_coverage_fields(
     assert hasattr(result, "projection_coverage")
     assert result.prefiltered_count == 3
     assert 0 <= result.projection_coverage <= 1.0
+
+
+def _flaky_funding_history(coin: str, start_time_ms: int = 0) -> list[dict]:
+    if coin.endswith(":TSLA"):
+        raise RuntimeError("upstream 502")
+    return _mock_funding_history(coin, start_time_ms)
+
+
+def test_prefetch_failure_rejects_only_that_coin(scan_mocks):
+    """A failed concurrent funding fetch rejects its own coin and nothing else."""
+    from engine.scanner import build_candidates
+
+    scan_mocks.funding.side_effect = _flaky_funding_history
+    markets = [m for m in _make_stock_markets(10) if m["ticker"] != "TSLA"]
+    markets.append({**markets[0], "coin": "xyz:TSLA", "ticker": "TSLA"})
+    result = build_candidates(markets, 640_000)
+
+    errors = [r for r in result.rejected if r["reason"].startswith("funding data error")]
+    assert [r["ticker"] for r in errors] == ["TSLA"]
+    assert scan_mocks.funding.call_count == len(markets)
+    assert len(result.candidates) == len(markets) - 1
+
+    # Epochs for every successfully fetched coin are written in one batch
+    scan_mocks.epoch.assert_called_once()
+    written = {row[0] for row in scan_mocks.epoch.call_args.args[0]}
+    assert written == {m["coin"] for m in markets} - {"xyz:TSLA"}
+
+    # ...and so are their EMAs
+    scan_mocks.ema.assert_called_once()
+    assert {row[0] for row in scan_mocks.ema.call_args.args[0]} == written
+
+
+def test_warm_scan_reuses_stored_epochs(scan_mocks):
+    """With epochs already stored, only the tail is fetched and results match a cold scan."""
+    from dataclasses import asdict
+
+    from engine.scanner import aggregate_to_8h_epochs, build_candidates
+
+    epoch_ms = 8 * 3600_000
+    base_ts = (int(time.time() * 1000) - 200 * 3600_000) // epoch_ms * epoch_ms
+    full = [
+        {"coin": "xyz:AAPL", "fundingRate": 0.0001 + (i % 7) * 1e-5, "time": base_ts + i * 3600_000}
+        for i in range(200)
+    ]
+
+    def fetch(coin, start_time_ms=0):
+        return [{**e, "coin": coin} for e in full if e["time"] >= start_time_ms]
+
+    # Stored rows end mid-epoch, as if the last scan ran 150 hours in
+    stored_rows = [
+        {**r, "coin": "xyz:AAPL", "is_weekend": int(r["is_weekend"])}
+        for r in aggregate_to_8h_epochs(full[:150]).to_records()
+    ]
+    markets = _make_stock_markets(1)
+    assert markets[0]["coin"] == "xyz:AAPL"
+
+    scan_mocks.funding.side_effect = fetch
+
+    def scan(stored):
+        scan_mocks.stored.return_value = stored
+        result = build_candidates(markets, 640_000)
+        return result, scan_mocks.funding.call_args.args, scan_mocks.epoch.call_args.args[0]
+
+    cold, cold_fetch, cold_epoch = scan({})
+    warm, warm_fetch, warm_epoch = scan({"xyz:AAPL": stored_rows})
+
+    assert cold_fetch == ("xyz:AAPL", 0)
+    resume_ms = base_ts + 18 * epoch_ms  # start of the partial epoch holding hour 149
+    assert warm_fetch == ("xyz:AAPL", resume_ms)
+    assert len(warm_epoch) < len(cold_epoch)
+    assert [asdict(c) for c in warm.candidates] == [asdict(c) for c in cold.candidates]
+    assert len(cold.candidates) == 1
+
+
+def test_funding_history_fetches_overlap(scan_mocks):
+    """Per-coin fundingHistory requests are in flight together, not one after another."""
+    import threading
+
+    from engine.scanner import build_candidates
+
+    markets = _make_stock_markets(4)
+    # Each fetch blocks until all four are in flight; serial fetching would time out
+    barrier = threading.Barrier(len(markets), timeout=5)
+
+    def fetch(coin, start_time_ms=0):
+        barrier.wait()
+        return _mock_funding_history(coin, start_time_ms)
+
+    scan_mocks.funding.side_effect = fetch
+    result = build_candidates(markets, 640_000)
+
+    assert not [r for r in result.rejected if r["reason"].startswith("funding data error")]
+    assert len(result.candidates) == len(markets)
+
+
+def test_scoring_gates_reject_in_cohort_order(scan_mocks):
+    """Masked depth/forecast gates keep cohort order and depth wins over forecast."""
+    from engine.scanner import build_candidates
+
+    markets = _make_stock_markets(4)
+    markets[0]["oi_usd"] = 0  # no position size → depth gate
+    markets[3]["oi_usd"] = 0  # fails both gates
+    negative = {markets[2]["coin"], markets[3]["coin"]}
+
+    def fetch(coin, start_time_ms=0):
+        rate = -0.0001 if coin in negative else 0.0001
+        return [{**e, "fundingRate": rate} for e in _funding_entries(coin)]
+
+    scan_mocks.funding.side_effect = fetch
+    result = build_candidates(markets, 640_000)
+
+    assert [(r["ticker"], r["reason"], r["score"] is None) for r in result.rejected] == [
+        (markets[0]["ticker"], "insufficient_orderbook_depth", True),
+        (markets[2]["ticker"], "negative funding forecast", False),
+        (markets[3]["ticker"], "insufficient_orderbook_depth", True),
+    ]
+    assert [c.ticker for c in result.candidates] == [markets[1]["ticker"]]
+
+
+def test_columnar_market_data_scans_like_row_dicts(scan_mocks):
+    """MarketData input is gated from its arrays and matches the legacy dict path."""
+    from dataclasses import asdict
+
+    from engine.hyperliquid import parse_market_data
+    from engine.scanner import build_candidates
+
+    coins = list(config.STOCK_COINS_ORDERED[:4]) + ["xyz:NOPE"]
+    universe = [{"name": c, "maxLeverage": 3 if i == 1 else 20} for i, c in enumerate(coins)]
+    ctxs = [
+        {"markPx": "100", "midPx": "100", "openInterest": "10000", "dayNtlVlm": "500000",
+         "funding": None if i == 2 else str(0.00003 - i * 0.00001)}
+        for i in range(len(coins))
+    ]
+    markets = parse_market_data(universe, ctxs)
+
+    columnar = build_candidates(markets, 640_000)
+    legacy = build_candidates(list(markets.rows()), 640_000)
+    assert [asdict(c) for c in columnar.candidates] == [asdict(c) for c in legacy.candidates]
+    assert columnar.rejected == legacy.rejected
+    assert ("maxLeverage 3 < 10") in [r["reason"] for r in columnar.rejected]
+
+
+def test_prefilter_reports_first_failing_gate_in_market_order():
+    """Vectorized pre-filter keeps the per-market gate priority and input order."""
+    from engine.scanner import build_candidates
+
+    base = {"funding_apr": 0.1, "max_leverage": 20, "oi_usd": 1e6, "volume_24h": 5e5}
+    markets = [
+        {**base, "coin": "xyz:NOPE", "ticker": "NOPE", "max_leverage": 1},   # no hedge wins over leverage
+        {**base, "coin": "xyz:TSLA", "ticker": "TSLA", "max_leverage": 3, "funding_missing": True},
+        {**base, "coin": "xyz:NVDA", "ticker": "NVDA", "funding_apr": None, "funding_missing": True},
+        {**base, "coin": "xyz:AAPL", "ticker": "AAPL", "funding_apr": -0.2},
+    ]
+    result = build_candidates(markets, 640_000)
+    assert [(r["ticker"], r["reason"]) for r in result.rejected] == [
+        ("NOPE", "missing_hedge_mapping"),
+        ("TSLA", "maxLeverage 3 < 10"),
+        ("NVDA", "missing_live_funding"),
+        ("AAPL", "negative/zero instantaneous funding"),
+    ]
+    assert result.rejected[2]["instant_apr"] is None
+    assert result.prefiltered_count == 0
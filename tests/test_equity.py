@@ -0,0 +1,130 @@
+"""Tests for NASDAQ symbol directory caching."""
+
+import os
+import threading
+import time
+from unittest.mock import patch
+
+import config
+from engine import equity
+
+
+def _reset_memory_cache():
+    equity._cache_state = (frozenset(), 0.0)
+
+
+def test_symbols_disk_cache_skips_network_on_restart(monkeypatch, tmp_path):
+    """A fresh disk cache is reused after the in-memory cache is lost."""
+    path = str(tmp_path / "nasdaq_symbols.json")
+    monkeypatch.setattr(config, "SYMBOLS_CACHE_PATH", path)
+    monkeypatch.setattr(config, "SYMBOLS_DISK_CACHE", True)
+    try:
+        _reset_memory_cache()
+        with patch("engine.equity._fetch_symbol_file", side_effect=[{"AAPL"}, {"IBM"}]) as fetch:
+            assert equity.refresh_public_symbols() is True
+        assert fetch.call_count == 2
+        assert os.path.exists(path)
+
+        _reset_memory_cache()  # simulate process restart
+        with patch("engine.equity._fetch_symbol_file") as fetch:
+            assert equity.is_public_equity("ibm")
+            assert not equity.is_public_equity("ZZZZ")
+        fetch.assert_not_called()
+    finally:
+        _reset_memory_cache()
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def test_is_public_equity_reads_published_snapshot():
+    """A fresh published snapshot is answered without refreshing."""
+    equity._cache_state = (frozenset({"AAPL"}), equity.time.time())
+    try:
+        with patch("engine.equity.refresh_public_symbols") as refresh:
+            assert equity.is_public_equity("aapl")
+            assert not equity.is_public_equity("ZZZZ")
+        refresh.assert_not_called()
+    finally:
+        _reset_memory_cache()
+
+
+def test_expired_snapshot_refreshes_once_then_serves_from_memory(monkeypatch):
+    """Past the TTL one lookup refreshes; later lookups reuse the new snapshot."""
+    monkeypatch.setattr(config, "SYMBOLS_DISK_CACHE", False)
+    equity._cache_state = (frozenset({"OLD"}), time.time() - equity._SYMBOLS_TTL - 1)
+    try:
+        with patch("engine.equity._fetch_symbol_file", side_effect=[{"AAPL"}, {"IBM"}]) as fetch:
+            assert equity.is_public_equity("AAPL")
+            assert equity.is_public_equity("AAPL")
+            assert not equity.is_public_equity("OLD")
+        assert fetch.call_count == 2  # one download per directory file, once
+    finally:
+        _reset_memory_cache()
+
+
+def test_symbols_disk_cache_disabled(monkeypatch, tmp_path):
+    """With the flag off, nothing is written and every refresh hits the network."""
+    path = str(tmp_path / "nasdaq_symbols_off.json")
+    monkeypatch.setattr(config, "SYMBOLS_CACHE_PATH", path)
+    monkeypatch.setattr(config, "SYMBOLS_DISK_CACHE", False)
+    try:
+        _reset_memory_cache()
+        with patch("engine.equity._fetch_symbol_file", return_value={"AAPL"}) as fetch:
+            assert equity.refresh_public_symbols() is True
+            _reset_memory_cache()
+            assert equity.refresh_public_symbols() is True
+        assert fetch.call_count == 4
+        assert not os.path.exists(path)
+    finally:
+        _reset_memory_cache()
+
+
+def test_concurrent_refreshes_share_one_fetch(monkeypatch):
+    """Callers arriving during a refresh wait for it instead of fetching again."""
+    monkeypatch.setattr(config, "SYMBOLS_DISK_CACHE", False)
+    calls = []
+
+    def slow_fetch(url):
+        calls.append(url)
+        time.sleep(0.05)
+        return {"AAPL"}
+
+    try:
+        _reset_memory_cache()
+        with patch("engine.equity._fetch_symbol_file", side_effect=slow_fetch):
+            results = []
+            threads = [
+                threading.Thread(target=lambda: results.append(equity.is_public_equity("AAPL")))
+                for _ in range(8)
+            ]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+        assert results == [True] * 8
+        assert len(calls) == 2  # one leader: nasdaq + other-listed
+    finally:
+        _reset_memory_cache()
+
+
+def test_parse_symbol_file():
+    """Header, footer and non-alphabetic symbols are skipped."""
+    text = (
+        "Symbol|Security Name|Market Category\n"
+        "AAPL|Apple Inc.|Q\n"
+        "brk.a|Berkshire|N\n"
+        " msft |Microsoft|Q\n"
+        "File Creation Time: 0101202600:00|||\n"
+        "LATE|After footer|Q\n"
+    )
+    assert equity._parse_symbol_lines(text.splitlines()) == {"AAPL", "MSFT"}
+
+
+def test_fetch_symbol_file_streams_lines(monkeypatch):
+    """Streamed download parses CRLF lines and stops at the footer."""
+    import httpx
+
+    body = "Symbol|Name\nAAPL|Apple\r\nIBM|IBM\nFile Creation Time: x|\nZZ|late\n"
+    transport = httpx.MockTransport(lambda request: httpx.Response(200, text=body))
+    monkeypatch.setattr(equity, "_NASDAQ_CLIENT", httpx.Client(transport=transport))
+    assert equity._fetch_symbol_file("https://example.invalid/nasdaqlisted.txt") == {"AAPL", "IBM"}
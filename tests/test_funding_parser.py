@@ -1,5 +1,7 @@
 """Tests for funding parser: missing vs zero vs positive vs negative."""
 
+import math
+
 from engine.hyperliquid import _parse_funding, parse_market_data
 
 
@@ -52,6 +54,13 @@ def test_parse_funding_negative():
     assert missing is False
 
 
+def test_parse_funding_nan_string():
+    """A literal "NaN" is not a usable rate → missing, same as the column mask."""
+    val, missing = _parse_funding("NaN")
+    assert val is None
+    assert missing is True
+
+
 def _make_pair(funding_val):
     """Helper: create minimal universe/ctx pair with given funding."""
     meta = {"name": "xyz:TEST", "maxLeverage": 20}
@@ -95,6 +104,19 @@ def test_parse_market_positive_funding():
     assert m["funding_hourly"] == 0.001
 
 
+def test_parse_market_columns():
+    """Columns are parallel arrays; missing funding is NaN in the APR column."""
+    meta, ctx = _make_pair("0.001")
+    meta2, ctx2 = _make_pair(None)
+    ctx2.pop("funding", None)
+    markets = parse_market_data([meta, meta2], [ctx, ctx2])
+    assert len(markets) == 2
+    assert list(markets.funding_missing) == [False, True]
+    assert markets.funding_apr[0] == 0.001 * 24 * 365
+    assert math.isnan(markets.funding_apr[1])
+    assert list(markets.oi_usd) == [r["oi_usd"] for r in markets.rows()]
+
+
 def test_scanner_rejects_missing_funding():
     """Scanner pre-filter should reject missing funding with structured code."""
     from engine.scanner import build_candidates
@@ -114,3 +136,21 @@ def test_scanner_rejects_missing_funding():
     assert len(missing_rej) == 1
     assert missing_rej[0]["ticker"] == "TSLA"
     assert missing_rej[0]["instant_apr"] is None
+
+
+def test_funding_history_times_are_int_ms(monkeypatch):
+    """fetch_funding_history normalizes every entry's time to int epoch-ms."""
+    import httpx
+
+    from engine import hyperliquid
+
+    body = (
+        b'[{"coin":"xyz:TSLA","fundingRate":"0.0001","time":1736899200000},'
+        b'{"coin":"xyz:TSLA","fundingRate":"0.0002","time":1736902800000.0},'
+        b'{"coin":"xyz:TSLA","fundingRate":"0.0003","time":"2025-01-15T02:00:00Z"}]'
+    )
+    transport = httpx.MockTransport(lambda request: httpx.Response(200, content=body))
+    monkeypatch.setattr(hyperliquid, "_HL_CLIENT", httpx.Client(transport=transport))
+    history = hyperliquid.fetch_funding_history("xyz:TSLA")
+    assert [e["time"] for e in history] == [1736899200000, 1736902800000, 1736906400000]
+    assert all(type(e["time"]) is int for e in history)
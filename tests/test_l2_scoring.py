@@ -1,6 +1,6 @@
 """Tests for L2 fail-closed scoring — no -10k% artifacts."""
 
-from engine.hyperliquid import compute_impact
+from engine.hyperliquid import book_arrays, compute_impact, find_max_notional_for_impact
 from engine.scanner import compute_score
 
 
@@ -40,6 +40,82 @@ def test_compute_impact_valid():
     assert impact < 0.01  # small order on decent book
 
 
+def test_compute_impact_top_of_book_fill_is_half_spread():
+    """An order that fits in the best level fills at the touch: impact = half-spread."""
+    book = {
+        "bids": [{"px": 100.0, "sz": 100}, {"px": 90.0, "sz": 100}],
+        "asks": [{"px": 101.0, "sz": 100}],
+    }
+    half_spread = 0.5 / 100.5
+    assert compute_impact(book, 5_000, side="sell") == half_spread
+    assert compute_impact(book, 10_000, side="sell") == half_spread
+    assert compute_impact(book, 10_001, side="sell") > half_spread  # touches level 2
+
+
+def test_max_notional_for_impact_is_tight():
+    """Closed-form max notional sits exactly on the impact limit."""
+    book = {
+        "bids": [
+            {"px": 100.0, "sz": 100},
+            {"px": 99.8, "sz": 100},
+            {"px": 99.5, "sz": 100},
+            {"px": 99.0, "sz": 100},
+        ],
+        "asks": [{"px": 100.2, "sz": 100}],
+    }
+    cap = find_max_notional_for_impact(book, 0.0025)
+    assert 0 < cap < 39_830
+    assert compute_impact(book, cap, side="sell") <= 0.0025
+    assert compute_impact(book, cap + 1, side="sell") > 0.0025
+
+
+def test_max_notional_whole_book_fits():
+    """If the whole book is within the limit, the cap is the full (fillable) depth."""
+    book = {"bids": [{"px": 100.0, "sz": 10}], "asks": [{"px": 100.1, "sz": 10}]}
+    cap = find_max_notional_for_impact(book, 0.0025)
+    assert cap == 1_000.0
+    assert compute_impact(book, cap, side="sell") < 1.0
+
+
+def test_soa_book_matches_legacy_layout():
+    """SoA arrays and list-of-dicts books give identical impact results."""
+    legacy = {
+        "bids": [{"px": 100.0, "sz": 100}, {"px": 99.5, "sz": 100}],
+        "asks": [{"px": 100.5, "sz": 100}],
+    }
+    bids_px, bids_sz, asks_px, asks_sz = book_arrays(legacy)
+    soa = {"bids_px": bids_px, "bids_sz": bids_sz, "asks_px": asks_px, "asks_sz": asks_sz}
+    assert compute_impact(soa, 12_000) == compute_impact(legacy, 12_000)
+    assert find_max_notional_for_impact(soa, 0.0025) == find_max_notional_for_impact(legacy, 0.0025)
+
+
+def test_compute_impact_matches_level_walk():
+    """Prefix-sum impact equals a level-by-level fill, partial last level included."""
+    import random
+
+    def level_walk(levels, notional, mid):
+        remaining, filled = notional, 0.0
+        for lvl in levels:
+            level_notional = lvl["px"] * lvl["sz"]
+            if level_notional >= remaining:
+                filled += remaining / lvl["px"]
+                remaining = 0.0
+                break
+            filled += lvl["sz"]
+            remaining -= level_notional
+        if remaining > 0:
+            return 1.0
+        return abs(notional / filled - mid) / mid
+
+    rng = random.Random(7)
+    for _ in range(200):
+        bids = [{"px": 100.0 - i * rng.uniform(0.01, 0.5), "sz": rng.uniform(1, 200)} for i in range(20)]
+        book = {"bids": bids, "asks": [{"px": 100.2, "sz": 50}]}
+        mid = (bids[0]["px"] + 100.2) / 2
+        notional = rng.uniform(1, 1.1 * sum(l["px"] * l["sz"] for l in bids))
+        assert abs(compute_impact(book, notional) - level_walk(bids, notional, mid)) < 1e-12
+
+
 def test_no_score_emitted_for_impact_1():
     """Score with impact=1.0 would produce ~-10,400% — verify the magnitude."""
     # This demonstrates why we gate on impact < 1
@@ -64,17 +140,37 @@ def test_score_gating_threshold():
 
 def test_ui_reason_labels_include_l2():
     """UI _REASON_LABELS covers new L2 reason codes."""
-    import ast
-    with open("ui.py") as f:
-        source = f.read()
-    tree = ast.parse(source)
-    for node in ast.walk(tree):
-        if isinstance(node, ast.Assign):
-            for target in node.targets:
-                if isinstance(target, ast.Name) and target.id == "_REASON_LABELS":
-                    labels = ast.literal_eval(node.value)
-                    assert "no_l2_orderbook" in labels
-                    assert "insufficient_orderbook_depth" in labels
-                    assert "_" not in labels["no_l2_orderbook"]
-                    return
-    raise AssertionError("_REASON_LABELS not found")
+    from tests._ui_source import ui_reason_labels
+
+    labels = ui_reason_labels()
+    assert "no_l2_orderbook" in labels
+    assert "insufficient_orderbook_depth" in labels
+    assert "_" not in labels["no_l2_orderbook"]
+
+
+def test_fetch_l2_books_bulk_caps_concurrency_and_keeps_errors(monkeypatch):
+    """Bulk fetch stays under the in-flight cap and maps failures per coin."""
+    import asyncio
+
+    from engine import hyperliquid
+
+    in_flight = peak = 0
+
+    async def fake_fetch(client, sem, coin):
+        nonlocal in_flight, peak
+        async with sem:
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.001)
+            in_flight -= 1
+        if coin == "bad":
+            raise RuntimeError("boom")
+        return {"coin": coin}
+
+    monkeypatch.setattr(hyperliquid, "_fetch_l2_book_async", fake_fetch)
+    coins = [f"c{i}" for i in range(25)] + ["bad"]
+    books = hyperliquid.fetch_l2_books_bulk(coins)
+    assert peak <= hyperliquid.L2_BULK_CONCURRENCY
+    assert books["c3"] == {"coin": "c3"}
+    assert isinstance(books["bad"], RuntimeError)
+    assert hyperliquid.fetch_l2_books_bulk([]) == {}
@@ -1,12 +1,16 @@
 """Tests for ranking transparency fields presence."""
 
+import numpy as np
+
 from engine.scanner import (
     ScanResult,
+    _forecast_and_score,
     aggregate_to_8h_epochs,
     compute_dual_ema,
     compute_score,
     compute_weekend_seasonality,
     forecast_72h_apr,
+    forecast_weights,
 )
 
 
@@ -17,6 +21,18 @@ def test_scan_result_has_deep_scan_cohort():
     assert sr.deep_scan_cohort == 0
 
 
+def test_scan_result_is_slotted_and_frozen():
+    """ScanResult is built once per scan and never mutated afterwards."""
+    import dataclasses
+
+    import pytest
+
+    sr = ScanResult(candidates=[], rejected=[], is_trading_hours=False)
+    assert not hasattr(sr, "__dict__")
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        sr.prefiltered_count = 1
+
+
 def test_compute_score_returns_triple():
     """compute_score should return (score, fee_drag, slippage_drag)."""
     score, fee_drag, slip_drag = compute_score(20.0, 0.001)
@@ -84,6 +100,22 @@ def test_dual_ema_exact_boundary():
     assert ema_7d is not None
 
 
+def test_dual_ema_matches_recurrence():
+    """Closed-form EMAs equal the seeded recurrence over each window."""
+    import config
+
+    def recurrence(values, alpha):
+        ema = values[0]
+        for v in values[1:]:
+            ema = alpha * v + (1 - alpha) * ema
+        return ema
+
+    aprs = [10.0 + (i * 7) % 11 - 0.3 * i for i in range(40)]
+    ema_3d, ema_7d = compute_dual_ema([{"apr": a} for a in aprs])
+    assert abs(ema_3d - recurrence(aprs[-config.EMA_3D_EPOCHS:], config.EMA_3D_ALPHA)) < 1e-9
+    assert abs(ema_7d - recurrence(aprs[-config.EMA_7D_EPOCHS:], config.EMA_7D_ALPHA)) < 1e-9
+
+
 def test_weekend_seasonality_insufficient_data():
     """With < 3 weekend epochs, seasonality should default to 1.0."""
     epochs = [{"apr": 10.0, "is_weekend": False} for _ in range(50)]
@@ -102,6 +134,22 @@ def test_forecast_weekend_vs_weekday():
     assert abs(weekend - 19.0) < 0.01
 
 
+def test_batched_forecast_and_score_match_scalar():
+    """The one-pass scoring kernel agrees with forecast_72h_apr + compute_score."""
+    ema_3d = np.array([30.0, 12.5, -4.0])
+    ema_7d = np.array([10.0, 14.0, 2.0])
+    seas = np.array([1.0, 0.8, 1.2])
+    impact = np.array([0.001, 0.0, 0.02])
+    for weekend in (False, True):
+        forecast, score, slip = _forecast_and_score(ema_3d, ema_7d, seas, impact, *forecast_weights(weekend))
+        for i in range(3):
+            f = forecast_72h_apr(ema_3d[i], ema_7d[i], seas[i], weekend)
+            s, _, sd = compute_score(f, impact[i])
+            assert abs(forecast[i] - f) < 1e-9
+            assert abs(score[i] - s) < 1e-9
+            assert abs(slip[i] - sd) < 1e-9
+
+
 def test_8h_epoch_aggregation():
     """Test that hourly entries aggregate into 8h buckets."""
     hourly = [
@@ -109,7 +157,68 @@ def test_8h_epoch_aggregation():
         {"time": "2025-01-15T01:00:00+00:00", "fundingRate": 0.002},
         {"time": "2025-01-15T08:00:00+00:00", "fundingRate": 0.003},
     ]
-    epochs = aggregate_to_8h_epochs(hourly)
+    epochs = aggregate_to_8h_epochs(hourly).to_records()
     assert len(epochs) == 2  # 00:00 bucket and 08:00 bucket
     # First bucket should have mean of 0.001 and 0.002
     assert abs(epochs[0]["rate_8h"] - 0.0015) < 0.0001
+
+
+def test_8h_epoch_bucket_layout_shared_across_coins():
+    """Coins with the same timestamps reuse one bucket layout; rates still differ."""
+    from engine.scanner import _bucket_layout
+
+    start = 1_736_899_200_000  # 2025-01-15T00:00Z
+    times = [start + h * 3600 * 1000 for h in range(24)]
+    a = [{"time": t, "fundingRate": 0.0001} for t in times]
+    b = [{"time": t, "fundingRate": 0.0002} for t in times]
+    _bucket_layout.cache_clear()
+    ea, eb = aggregate_to_8h_epochs(a), aggregate_to_8h_epochs(b)
+    assert _bucket_layout.cache_info().hits == 1
+    assert ea.epoch_ts is eb.epoch_ts
+    assert np.allclose(eb.rate_8h, 2 * ea.rate_8h)
+    # One hour missing changes the layout → no stale reuse
+    ec = aggregate_to_8h_epochs(b[:-1])
+    assert _bucket_layout.cache_info().misses == 2
+    assert ec.to_records() == eb.to_records()
+    # Same length, ends and sum but hours 7/8 swapped across an epoch edge → miss
+    swapped = list(a)
+    swapped[7], swapped[8] = {**a[7], "time": times[8]}, {**a[8], "time": times[7], "fundingRate": 0.0004}
+    es = aggregate_to_8h_epochs(swapped)
+    assert _bucket_layout.cache_info().misses == 3
+    _bucket_layout.cache_clear()
+    assert es.to_records() == aggregate_to_8h_epochs(swapped).to_records()
+
+
+def test_8h_epoch_weekend_tags_follow_et_across_dst():
+    """Weekend tag uses the ET calendar day of the epoch start, in EST and EDT."""
+    for month_day in ("01-10", "07-11"):  # Fri Jan 10 (EST) / Fri Jul 11 (EDT), 2025
+        day = int(month_day[-2:])
+        hourly = [
+            {"time": f"2025-{month_day[:2]}-{d:02d}T{h:02d}:00:00Z", "fundingRate": 0.0001}
+            for d in (day, day + 1, day + 2, day + 3) for h in (0, 8, 16)
+        ]
+        tags = aggregate_to_8h_epochs(hourly).is_weekend.tolist()
+        # Fri 00 UTC (Thu ET) .. Mon 00 UTC (Sun ET) is weekend, Mon 08 UTC is not
+        assert tags == [False, False, False,
+                        False, True, True,
+                        True, True, True,
+                        True, False, False]
+
+
+def test_et_weekend_mask_matches_zoneinfo_for_a_year():
+    """Fixed-offset weekday bitmap equals a real ET conversion for every epoch start."""
+    from datetime import datetime, timezone
+    from zoneinfo import ZoneInfo
+
+    import numpy as np
+
+    from engine.scanner import _et_weekend_mask
+
+    et = ZoneInfo("America/New_York")
+    start = int(datetime(2025, 1, 1, tzinfo=timezone.utc).timestamp() * 1000)
+    starts = start + np.arange(3 * 366) * 8 * 3600 * 1000
+    expected = [
+        datetime.fromtimestamp(ms / 1000, tz=timezone.utc).astimezone(et).weekday() >= 5
+        for ms in starts.tolist()
+    ]
+    assert _et_weekend_mask(starts).tolist() == expected
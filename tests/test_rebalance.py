@@ -80,6 +80,23 @@ def test_empty_portfolios():
     assert isinstance(decision.rationale, str)
 
 
+def test_cold_start_switches_without_cost():
+    """First run recommends SWITCH with ADD changes and no switching cost."""
+    new = [
+        _make_position("xyz:TSLA", "TSLA", 50000),
+        _make_position("xyz:AAPL", "AAPL", 30000),
+        _make_position("xyz:INTC", "INTC", 50),  # below min change
+    ]
+    decision = evaluate_rebalance([], new, 640_000)
+    assert decision.recommendation == "SWITCH"
+    assert decision.estimated_cost_usd == 0.0
+    assert decision.expected_gain_usd > 0
+    assert [c["ticker"] for c in decision.changes] == ["AAPL", "TSLA"]
+    assert {c["action"] for c in decision.changes} == {"ADD"}
+
+    assert evaluate_rebalance([], [], 640_000).recommendation == "HOLD"
+
+
 def test_decision_has_changes():
     """Decision should list per-position changes."""
     old = [_make_position("xyz:INTC", "INTC", 50000)]
@@ -34,3 +34,10 @@ def test_non_stock_has_hedge_mapping():
     """Every NON_STOCK_COINS entry should have a HEDGE_MAP entry."""
     for coin in config.NON_STOCK_COINS:
         assert coin in config.HEDGE_MAP, f"{coin} in NON_STOCK_COINS but not in HEDGE_MAP"
+
+
+def test_stock_coins_partition_hedge_map():
+    """STOCK_COINS is exactly the mapped coins that are not NON_STOCK_COINS, in map order."""
+    assert config.STOCK_COINS.isdisjoint(config.NON_STOCK_COINS)
+    assert config.STOCK_COINS | config.NON_STOCK_COINS == set(config.HEDGE_MAP)
+    assert list(config.STOCK_COINS_ORDERED) == [c for c in config.HEDGE_MAP if c in config.STOCK_COINS]
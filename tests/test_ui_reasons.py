@@ -1,30 +1,12 @@
 """Tests for UI rejection reason code handling."""
 
-# Import the reason label mapping directly — test that it covers all scanner codes
-import importlib
-import sys
-
-
-def _get_ui_reason_labels() -> dict:
-    """Import _REASON_LABELS from ui module without running Streamlit."""
-    # We can't import ui.py directly (it calls st.set_page_config at import).
-    # Instead, parse it and extract the dict.
-    import ast
-    with open("ui.py") as f:
-        source = f.read()
-    # Find the _REASON_LABELS assignment
-    tree = ast.parse(source)
-    for node in ast.walk(tree):
-        if isinstance(node, ast.Assign):
-            for target in node.targets:
-                if isinstance(target, ast.Name) and target.id == "_REASON_LABELS":
-                    return ast.literal_eval(node.value)
-    raise RuntimeError("_REASON_LABELS not found in ui.py")
+# ui.py can't be imported under test, so the helpers read its source instead
+from tests._ui_source import ui_reason_labels, ui_source
 
 
 def test_reason_labels_cover_structured_codes():
     """All structured reason codes from scanner should have UI labels."""
-    labels = _get_ui_reason_labels()
+    labels = ui_reason_labels()
     required_codes = [
         "missing_hedge_mapping",
         "non_stock_market_excluded",
@@ -43,15 +25,14 @@ def test_reason_labels_cover_structured_codes():
 
 def test_reason_labels_are_human_readable():
     """Labels should not be raw codes (no underscores)."""
-    labels = _get_ui_reason_labels()
+    labels = ui_reason_labels()
     for code, label in labels.items():
         assert "_" not in label, f"Label for '{code}' looks like a raw code: '{label}'"
 
 
 def test_no_legacy_substring_matching_in_diagnostics():
     """UI diagnostics should use exact reason code matching, not substring contains."""
-    with open("ui.py") as f:
-        source = f.read()
+    source = ui_source()
     # The old pattern was: "not in public directories" in r.get("reason", "")
     # This should no longer appear
     assert '"not in public directories" in' not in source, \
@@ -62,8 +43,7 @@ def test_no_legacy_substring_matching_in_diagnostics():
 
 def test_diagnostics_uses_structured_lookup():
     """UI diagnostics should use reason_counts dict with exact code keys."""
-    with open("ui.py") as f:
-        source = f.read()
+    source = ui_source()
     # Should use .get("not_in_public_directories") not substring match
     assert 'reason_counts.get("not_in_public_directories"' in source
     assert 'reason_counts.get("insufficient_history"' in source
@@ -1,25 +1,30 @@
 """Tests for waterfall micro-allocation — no hard min-ticket gate."""
 
+from dataclasses import dataclass
+
 import config
 from engine.allocator import build_portfolio, Position
 
 
+@dataclass(slots=True, frozen=True)
 class FakeCandidate:
     """Minimal candidate for allocator testing."""
-    def __init__(self, coin, ticker, hedge, score, cap_oi, cap_vol, cap_impact):
-        self.coin = coin
-        self.ticker = ticker
-        self.hedge_symbol = hedge
-        self.score = score
-        self.cap_oi = cap_oi
-        self.cap_vol = cap_vol
-        self.cap_impact = cap_impact
-        self.forecast_apr = score + 5
-        self.slippage_drag_apr = 1.0
-        self.fee_drag_apr = 4.0
-        self.ema_3d = 20.0
-        self.ema_7d = 18.0
-        self.weekend_mult = 1.0
+    coin: str
+    ticker: str
+    hedge_symbol: str
+    score: float
+    cap_oi: float
+    cap_vol: float
+    cap_impact: float
+    slippage_drag_apr: float = 1.0
+    fee_drag_apr: float = 4.0
+    ema_3d: float = 20.0
+    ema_7d: float = 18.0
+    weekend_mult: float = 1.0
+
+    @property
+    def forecast_apr(self) -> float:
+        return self.score + 5
 
 
 def test_small_budget_nonzero_allocation():
@@ -91,3 +96,35 @@ def test_large_budget_unchanged():
     # Risk caps still binding
     for pos in portfolio.positions:
         assert pos.alloc_notional <= pos.cap_final + 0.01
+
+
+def test_build_portfolio_memoized_on_content():
+    """Equal candidate content reuses the previous result; any change rebuilds."""
+    def make(score):
+        return [FakeCandidate("xyz:TSLA", "TSLA", "TSLA", score,
+                              cap_oi=5_000, cap_vol=5_000, cap_impact=5_000)]
+
+    first = build_portfolio(make(15.0), 80_000)
+    assert build_portfolio(make(15.0), 80_000) is first
+    changed = build_portfolio(make(16.0), 80_000)
+    assert changed is not first
+    assert changed.positions[0].score == 16.0
+    # The shared result cannot be mutated by one caller under another
+    assert isinstance(first.positions, tuple)
+
+
+def test_cached_portfolio_is_read_only():
+    """Frozen Portfolio/Position plus tuple positions: no caller can alter the shared result."""
+    import dataclasses
+
+    import pytest
+
+    cand = FakeCandidate("xyz:TSLA", "TSLA", "TSLA", 15.0,
+                         cap_oi=5_000, cap_vol=5_000, cap_impact=5_000)
+    portfolio = build_portfolio([cand], 80_000)
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        portfolio.positions = ()
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        portfolio.positions[0].alloc_notional = 0
+    with pytest.raises(AttributeError):
+        portfolio.positions.append(portfolio.positions[0])
@@ -4,6 +4,7 @@ import logging
 import signal
 import sys
 import time
+from datetime import datetime, timedelta
 
 from apscheduler.schedulers.background import BackgroundScheduler
 
@@ -27,19 +28,21 @@ def market_refresh_job():
         markets = hyperliquid.parse_market_data(universe, ctxs)
         log.info("Fetched %d xyz markets", len(markets))
 
-        # Upsert all market snapshots
-        for m in markets:
-            db.upsert_market_snapshot(m["ticker"], {
-                "coin": m["coin"],
-                "mark_px": m["mark_px"],
-                "mid_px": m["mid_px"],
-                "funding_hourly": m["funding_hourly"],
-                "funding_apr": m["funding_apr"],
-                "oi": m["oi_base"],
-                "oi_usd": m["oi_usd"],
-                "volume_24h": m["volume_24h"],
-                "max_leverage": m["max_leverage"],
-            })
+        # One timestamp for every row written this tick
+        ts = db.utc_now()
+
+        # Upsert all market snapshots in one transaction
+        db.upsert_market_snapshots(((m["ticker"], {
+            "coin": m["coin"],
+            "mark_px": m["mark_px"],
+            "mid_px": m["mid_px"],
+            "funding_hourly": m["funding_hourly"],
+            "funding_apr": m["funding_apr"],
+            "oi": m["oi_base"],
+            "oi_usd": m["oi_usd"],
+            "volume_24h": m["volume_24h"],
+            "max_leverage": m["max_leverage"],
+        }) for m in markets.rows()), ts)
 
         # Get user budget
         user = db.get_user_inputs()
@@ -84,43 +87,39 @@ def market_refresh_job():
                  decision.recommendation, decision.expected_gain_usd,
                  decision.estimated_cost_usd, decision.threshold_usd)
 
-        # Save portfolio positions to DB
-        db.clear_portfolio_positions()
-        for pos in portfolio.positions:
-            db.upsert_portfolio_position(pos.coin, {
-                "ticker": pos.ticker,
-                "hedge_symbol": pos.hedge_symbol,
-                "rank": pos.rank,
-                "alloc_notional": pos.alloc_notional,
-                "alloc_pct": pos.alloc_pct,
-                "cap_oi": pos.cap_oi,
-                "cap_vol": pos.cap_vol,
-                "cap_impact": pos.cap_impact,
-                "cap_conc": pos.cap_conc,
-                "cap_final": pos.cap_final,
-                "binding_cap": pos.binding_cap,
-                "forecast_apr": pos.forecast_apr,
-                "net_apr": pos.net_apr,
-                "slippage_drag_apr": pos.slippage_drag_apr,
-                "fee_drag_apr": pos.fee_drag_apr,
-                "score": pos.score,
-                "ema_3d": pos.ema_3d,
-                "ema_7d": pos.ema_7d,
-                "weekend_mult": pos.weekend_mult,
-            })
+        # Save portfolio positions to DB (replaces the previous set atomically)
+        db.replace_portfolio_positions(((pos.coin, {
+            "ticker": pos.ticker,
+            "hedge_symbol": pos.hedge_symbol,
+            "rank": pos.rank,
+            "alloc_notional": pos.alloc_notional,
+            "alloc_pct": pos.alloc_pct,
+            "cap_oi": pos.cap_oi,
+            "cap_vol": pos.cap_vol,
+            "cap_impact": pos.cap_impact,
+            "cap_conc": pos.cap_conc,
+            "cap_final": pos.cap_final,
+            "binding_cap": pos.binding_cap,
+            "forecast_apr": pos.forecast_apr,
+            "net_apr": pos.net_apr,
+            "slippage_drag_apr": pos.slippage_drag_apr,
+            "fee_drag_apr": pos.fee_drag_apr,
+            "score": pos.score,
+            "ema_3d": pos.ema_3d,
+            "ema_7d": pos.ema_7d,
+            "weekend_mult": pos.weekend_mult,
+        }) for pos in portfolio.positions), ts)
 
         # Save rejected markets
-        db.clear_rejected_markets()
-        for rej in scan_result.rejected:
-            db.upsert_rejected_market(rej["coin"], {
-                "ticker": rej["ticker"],
-                "reason": rej["reason"],
-                "instant_apr": rej.get("instant_apr"),
-                "forecast_apr": rej.get("forecast_apr"),
-                "score": rej.get("score"),
-                "cap_final": rej.get("cap_final"),
-                "pre_rank": rej.get("pre_rank"),
-            })
+        db.replace_rejected_markets(((rej["coin"], {
+            "ticker": rej["ticker"],
+            "reason": rej["reason"],
+            "instant_apr": rej.get("instant_apr"),
+            "forecast_apr": rej.get("forecast_apr"),
+            "score": rej.get("score"),
+            "cap_final": rej.get("cap_final"),
+            "pre_rank": rej.get("pre_rank"),
+        }) for rej in scan_result.rejected), ts)
 
         # Determine run status
         if portfolio.num_positions > 0:
@@ -181,13 +180,12 @@ def _evaluate_alerts(scan_result: scanner.ScanResult, portfolio):
         worst_pos = min(positions, key=lambda p: p.score)
         portfolio_coins = {p.coin for p in positions}
 
-        # Best candidate NOT already in portfolio
-        outside_candidates = [c for c in candidates if c.coin not in portfolio_coins]
-        if not outside_candidates:
+        # Best candidate NOT already in portfolio (candidates are sorted by
+        # score desc, so the first match is the best; stop scanning there)
+        best_outside = next((c for c in candidates if c.coin not in portfolio_coins), None)
+        if best_outside is None:
             return
 
-        best_outside = outside_candidates[0]  # already sorted by score desc
-
         advantage = best_outside.score - worst_pos.score
 
         # OPPORTUNITY: advantage exceeds hurdle
@@ -252,6 +250,16 @@ def scanner_job():
         alerts.send_critical_alert("SYSTEM", "Scanner job failed — check logs")
 
 
+def housekeeping_job():
+    """Daily job: prune resolved alert history and refresh planner stats."""
+    try:
+        pruned = db.prune_alert_history()
+        db.optimize()
+        log.info("Housekeeping: pruned %d alert(s)", pruned)
+    except Exception:
+        log.exception("Housekeeping job failed")
+
+
 def main():
     log.info("Arbiter Worker v2 starting...")
 
@@ -270,6 +278,14 @@ def main():
         seconds=config.SCANNER_INTERVAL,
         id="scanner", replace_existing=True, max_instances=1,
     )
+    # First run shortly after startup: with a daily interval alone, a worker
+    # restarted more often than that would never prune or optimize.
+    sched.add_job(
+        housekeeping_job, "interval",
+        seconds=config.HOUSEKEEPING_INTERVAL,
+        next_run_time=datetime.now() + timedelta(seconds=config.HOUSEKEEPING_STARTUP_DELAY),
+        id="housekeeping", replace_existing=True, max_instances=1,
+    )
 
     sched.start()
     log.info("Scheduler started (refresh %ds, scanner %ds)",